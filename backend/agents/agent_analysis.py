@@ -1,15 +1,232 @@
 import logging
-import numpy as np
+import os
+from typing import Iterable, Optional
 import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
+from repositories.vector_chroma_db.retrieval_result import RetrievalResult
+
+# Record fields each analysis reads; retrieval fetches only these.
+ANALYSIS_REQUIRED_FIELDS = {
+    'calculate_total_downtime': ['documents', 'metadatas'],
+    'aggregate_by_line': ['metadatas'],
+    'cluster_and_aggregate': ['documents', 'metadatas', 'clusters'],
+    'find_most_frequent_causes': ['documents'],
+}
+DEFAULT_REQUIRED_FIELDS = ['documents', 'metadatas']
+# Analyses that only need per-line downtime totals and the top incidents; they are computed inside the analytics store.
+PUSHDOWN_ANALYSES = ('calculate_total_downtime', 'aggregate_by_line')
+# Analyses that can consume their logs page by page (see STREAMING_AGGREGATORS).
+STREAMING_ANALYSES = ('calculate_total_downtime', 'aggregate_by_line', 'find_most_frequent_causes')
+
+
+# Similarity-search results requested for analyses that aggregate over the matches ("how often did X happen");
+# the similarity threshold then decides how many of them are relevant.
+AGGREGATE_CANDIDATE_POOL = int(os.getenv("AGGREGATE_CANDIDATE_POOL", "200"))
+AGGREGATING_ANALYSES = ('calculate_total_downtime', 'aggregate_by_line', 'cluster_and_aggregate',
+                        'find_most_frequent_causes')
+
+
+def required_fields(analysis_type: str = None) -> list:
+    return ANALYSIS_REQUIRED_FIELDS.get(analysis_type, DEFAULT_REQUIRED_FIELDS)
+
+
+def candidate_pool(analysis_types: list) -> Optional[int]:
+    """How many similarity-search results the analyses need, or None for the query type's default."""
+    if any(analysis_type in AGGREGATING_ANALYSES for analysis_type in analysis_types):
+        return AGGREGATE_CANDIDATE_POOL
+    return None
+
+
+def _format_top_incidents(top_incidents_df: pd.DataFrame) -> list:
+    top_incidents = top_incidents_df.rename(columns={
+        'Downtime Minutes': 'minutes',
+        'documents': 'note',
+        'Line': 'line',
+        'Timestamp': 'timestamp'
+    })
+    top_incidents['note'] = top_incidents['note'].apply(lambda x: x if x else "No notes provided")
+    top_incidents['minutes'] = top_incidents['minutes'].astype(int)
+    return top_incidents[['minutes', 'note', 'line', 'timestamp']].to_dict('records')
+
+
+class TotalDowntimeAggregator:
+    """calculate_total_downtime over pages of logs: running sum and count, plus the 5 longest incidents so far."""
+
+    def __init__(self):
+        self.total_downtime = 0
+        self.entry_count = 0
+        self.top_incidents = None
+
+    def update(self, data: pd.DataFrame) -> None:
+        if data.empty:
+            return
+        data = data.assign(**{'Downtime Minutes': pd.to_numeric(data['Downtime Minutes'], errors='coerce').fillna(0)})
+        self.total_downtime += data['Downtime Minutes'].sum()
+        self.entry_count += len(data)
+        # Earlier pages come first, so ties keep the same rows a single nlargest over all logs would.
+        candidates = data if self.top_incidents is None else pd.concat([self.top_incidents, data], ignore_index=True)
+        self.top_incidents = candidates.nlargest(5, 'Downtime Minutes')
+
+    def result(self) -> dict:
+        if not self.entry_count:
+            return {
+                "total_downtime_minutes": 0,
+                "entry_count": 0,
+                "top_downtimes": []
+            }
+        return {
+            "total_downtime_minutes": int(self.total_downtime),
+            "entry_count": int(self.entry_count),
+            "top_downtimes": _format_top_incidents(self.top_incidents)
+        }
+
+
+class LineDowntimeAggregator:
+    """aggregate_by_line over pages of logs: running downtime total per line."""
+
+    def __init__(self):
+        self.line_downtime = None
+
+    def update(self, data: pd.DataFrame) -> None:
+        if data.empty:
+            return
+        minutes = pd.to_numeric(data['Downtime Minutes'], errors='coerce').fillna(0)
+        page_totals = minutes.groupby(data['Line']).sum()
+        if self.line_downtime is not None:
+            page_totals = pd.concat([self.line_downtime, page_totals]).groupby(level=0).sum()
+        self.line_downtime = page_totals
+
+    def result(self) -> dict:
+        if self.line_downtime is None:
+            return {"top_lines_by_downtime": []}
+        line_downtime = self.line_downtime.rename_axis('Line').rename('Downtime Minutes')
+        line_downtime = line_downtime.sort_values(ascending=False).head(5)
+        return {"top_lines_by_downtime": line_downtime.reset_index().rename(
+            columns={'Line': 'line', 'Downtime Minutes': 'total_downtime_minutes'}
+        ).to_dict('records')}
+
+
+class NoteFrequencyAggregator:
+    """find_most_frequent_causes over pages of logs: running count per distinct note."""
+
+    def __init__(self):
+        self.row_count = 0
+        self.note_counts = {}
+
+    def update(self, data: pd.DataFrame) -> None:
+        self.row_count += len(data)
+        if data.empty:
+            return
+        notes = data['documents'][data['documents'].notna() & (data['documents'] != '')]
+        for note, count in notes.value_counts(sort=False).items():
+            self.note_counts[note] = self.note_counts.get(note, 0) + int(count)
+
+    def result(self) -> dict:
+        if not self.row_count:
+            return {"most_frequent_downtimes": []}
+        total_logs_with_notes = sum(self.note_counts.values())
+        if not total_logs_with_notes:
+            return {"error": "No notes were found to analyze."}
+        # Stable sort: among equal counts the note seen first wins, as with value_counts.
+        note_counts = sorted(self.note_counts.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "total_logs_analyzed": total_logs_with_notes,
+            "most_frequent_downtimes": [{
+                "note": note,
+                "incident_count": count,
+                "percentage": round((count / total_logs_with_notes) * 100, 1)
+            } for note, count in note_counts]
+        }
+
+
+STREAMING_AGGREGATORS = {
+    'calculate_total_downtime': TotalDowntimeAggregator,
+    'aggregate_by_line': LineDowntimeAggregator,
+    'find_most_frequent_causes': NoteFrequencyAggregator,
+}
 
 
 class AgentAnalysis:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
-    def execute_analysis_task(self, task, data: pd.DataFrame) -> dict:
+    def _aggregate_stored_clusters(self, data: pd.DataFrame) -> dict:
+        """
+        Ranks the precomputed cause clusters of the retrieved logs by total downtime. Logs with notes that could not
+        be put in a cluster (no embedding in Chroma) are reported as unclustered_incident_count.
+        """
+        self.logger.info("🔬 [Analysis] Aggregating precomputed cause clusters...")
+        clustered = data[data['cluster_id'].notna()].copy()
+        unclustered_count = int((data['cluster_id'].isna() & data['documents'].notna() & (data['documents'] != '')).sum())
+
+        clustered['Downtime Minutes'] = pd.to_numeric(clustered['Downtime Minutes'], errors='coerce').fillna(0)
+        clustered['cluster_label'] = clustered['cluster_label'].fillna("N/A")
+        # Clusters that share a label describe the same cause, so they are reported together.
+        cluster_analysis = clustered.groupby('cluster_label').agg(
+            total_downtime_minutes=('Downtime Minutes', 'sum'),
+            incident_count=('cluster_id', 'size')
+        )
+        ranked_clusters_df = cluster_analysis.sort_values(
+            ['total_downtime_minutes', 'incident_count'], ascending=False, kind='stable').head(5)
+        ranked_clusters_df['total_downtime_minutes'] = ranked_clusters_df['total_downtime_minutes'].astype(int)
+        result = {"top_causes": ranked_clusters_df.reset_index().to_dict('records')}
+        if unclustered_count:
+            self.logger.warning(f"AgentAnalysis: {unclustered_count} logs with notes have no cause cluster.")
+            result["unclustered_incident_count"] = unclustered_count
+        return result
+
+    def summarize_aggregates(self, task, aggregates: dict) -> dict:
+        """
+        Same output as execute_analysis_task for the PUSHDOWN_ANALYSES, built from per-line totals and top logs
+        (see AgentRetrieval.aggregate_downtime) instead of the raw rows.
+        """
+        analysis_type = task.get('type')
+        self.logger.info(f"AgentAnalysis: Summarizing pre-aggregated downtime for '{analysis_type}'")
+        by_line = aggregates.get('by_line', [])
+
+        if analysis_type == 'calculate_total_downtime':
+            entry_count = sum(row['event_count'] for row in by_line)
+            if not entry_count:
+                return {
+                    "total_downtime_minutes": 0,
+                    "entry_count": 0,
+                    "top_downtimes": []
+                }
+            return {
+                "total_downtime_minutes": int(sum(row['downtime_minutes'] for row in by_line)),
+                "entry_count": int(entry_count),
+                "top_downtimes": aggregates.get('top_logs', [])
+            }
+
+        elif analysis_type == 'aggregate_by_line':
+            lines = sorted((row for row in by_line if row['line'] is not None),
+                           key=lambda row: (-row['downtime_minutes'], row['line']))
+            return {"top_lines_by_downtime": [
+                {"line": row['line'], "total_downtime_minutes": row['downtime_minutes']} for row in lines[:5]
+            ]}
+
+        raise ValueError(f"Analysis '{analysis_type}' cannot be answered from aggregates")
+
+    def execute_streaming_analysis(self, task, pages: Iterable[RetrievalResult]) -> dict:
+        """
+        Same output as execute_analysis_task for the STREAMING_ANALYSES, consuming the logs page by page
+        (see AgentRetrieval.iter_data) so only one page and the running aggregate are held in memory.
+        """
+        analysis_type = task.get('type')
+        self.logger.info(f"AgentAnalysis: Streaming analysis task of type '{analysis_type}'")
+        aggregator = STREAMING_AGGREGATORS[analysis_type]()
+        page_count = 0
+        for page in pages:
+            aggregator.update(page.frame)
+            page_count += 1
+        self.logger.info(f"AgentAnalysis: Aggregated {page_count} pages for '{analysis_type}'")
+        return aggregator.result()
+
+    def execute_analysis_task(self, task, retrieved: RetrievalResult) -> dict:
+        if isinstance(retrieved, pd.DataFrame):
+            retrieved = RetrievalResult(frame=retrieved)
+        data = retrieved.frame
         analysis_type = task.get('type')
         self.logger.info(f"AgentAnalysis: Executing analysis task of type '{analysis_type}'")
 
@@ -25,15 +242,7 @@ class AgentAnalysis:
 
             total_downtime = data['Downtime Minutes'].sum()
             entry_count = len(data)
-            top_incidents = top_incidents_df.rename(columns={
-                'Downtime Minutes': 'minutes',
-                'documents': 'note',
-                'Line': 'line',
-                'Timestamp': 'timestamp'
-            })
-            top_incidents['note'] = top_incidents['note'].apply(lambda x: x if x else "No notes provided")
-            top_incidents['minutes'] = top_incidents['minutes'].astype(int)
-            top_incidents = top_incidents[['minutes', 'note', 'line', 'timestamp']].to_dict('records')
+            top_incidents = _format_top_incidents(top_incidents_df)
 
             return {
                 "total_downtime_minutes": int(total_downtime),
@@ -54,16 +263,26 @@ class AgentAnalysis:
             return {"top_lines_by_downtime": top_lines_formatted}
 
         elif analysis_type == 'cluster_and_aggregate':
+            if 'cluster_id' in data.columns:
+                has_notes = data['documents'].notna() & (data['documents'] != '')
+                # Clusters are only complete when every log with notes has one; otherwise cluster at query time
+                # when the embeddings are there, and report the logs that cannot be clustered when they are not.
+                if data.loc[has_notes, 'cluster_id'].notna().all() or retrieved.embeddings is None:
+                    return self._aggregate_stored_clusters(data)
+
             self.logger.info("🔬 [Analysis] Clustering notes to find top causes...")
 
-            if 'embeddings' not in data.columns:
+            if retrieved.embeddings is None:
                 return {"error": "Embeddings not found in data, cannot perform clustering."}
+            if retrieved.empty:
+                return {"error": "No notes with embeddings were found to analyze."}
 
-            logs_with_notes = data[data['documents'].notna() & (data['documents'] != '') & data['embeddings'].notna()].copy()
-            if logs_with_notes.empty:
+            notes = retrieved.select((data['documents'].notna() & (data['documents'] != '')).to_numpy())
+            if notes.empty:
                 return {"error": "No notes with embeddings were found to analyze."}
 
-            embeddings = np.array(logs_with_notes['embeddings'].tolist())
+            logs_with_notes = notes.frame.copy()
+            embeddings = notes.embeddings
             n_samples, n_features = embeddings.shape
 
             n_components = min(n_samples, n_features, 20)
@@ -1,37 +1,102 @@
 from agents.llm_models.huggingface_inference_client import HuggingFaceInferenceService
 from agents.llm_models.model_registry import DEFAULT_MODEL_ID
 from agents.utils.orchestrator_prompt import ORCHESTRATOR_PROMPT_TEMPLATE, EXAMPLES, PLAN_SCHEMA
+from agents.utils.plan_cache import plan_cache, build_plan_cache_key
+from agents.utils.fast_path_planner import FastPathPlanner, planner_stats
 from typing import Dict, Any
+import asyncio
 import logging
 import json
 import re
+import time
 import datetime
 
 
 class AgentOrchestrator:
     def __init__(self, model_id: str = None):
-        self.llm_service = HuggingFaceInferenceService(model_id=model_id or DEFAULT_MODEL_ID)
+        self.model_id = model_id or DEFAULT_MODEL_ID
+        self.llm_service = HuggingFaceInferenceService(model_id=self.model_id)
+        self.fast_path_planner = FastPathPlanner()
         self.logger = logging.getLogger(__name__)
 
+    def _record_plan_source(self, source: str, started_at: float) -> None:
+        elapsed = time.perf_counter() - started_at
+        planner_stats.record(source, elapsed)
+        self.logger.info(f"Orchestrator: Plan source '{source}' took {elapsed * 1000:.1f} ms.")
+
+    def _plan_without_llm(self, user_query: str, conversation_history: list, now: datetime.datetime,
+                          started_at: float):
+        fast_plan = self.fast_path_planner.plan(user_query, now)
+        if fast_plan is not None:
+            self._record_plan_source("fast_path", started_at)
+            return fast_plan, None
+
+        # Plans are cached before date conversion, so relative dates still resolve against the time of each query.
+        cache_key = build_plan_cache_key(self.model_id, user_query, conversation_history, now)
+        cached_plan = plan_cache.get(cache_key)
+        if cached_plan is not None:
+            self.logger.info(f"Orchestrator: Plan cache hit for user query: {user_query}.")
+            self._record_plan_source("cache", started_at)
+        return cached_plan, cache_key
+
+    def _build_messages(self, user_query: str, conversation_history: list, now: datetime.datetime) -> list:
+        system_instructions = ORCHESTRATOR_PROMPT_TEMPLATE.format(current_date_iso=now.isoformat())
+        messages = [{"role": "system", "content": system_instructions}]
+        messages.extend(EXAMPLES)
+
+        if conversation_history:
+            for message in conversation_history:
+                messages.append({"role": message["role"], "content": message["content"]})
+
+        messages.append({"role": "user", "content": user_query})
+        return messages
+
+    def _parse_plan(self, response, started_at: float) -> Dict[str, Any]:
+        json_str = response.choices[0].message.content.strip()
+
+        if "```" in json_str:
+            json_str = json_str.replace("```json", "").replace("```", "")
+
+        json_str = re.sub(r'\s+', ' ', json_str).strip()
+        plan = json.loads(json_str)
+        self.logger.info(f"Orchestrator Generated Plan: {plan}")
+        self._record_plan_source("llm", started_at)
+        return plan
+
+    @staticmethod
+    def _cache_plan(cache_key: str, plan) -> None:
+        if isinstance(plan, dict) and isinstance(plan.get('steps'), list):
+            plan_cache.put(cache_key, plan)
+
+    def _fallback_plan(self, error: Exception, response, started_at: float) -> Dict[str, Any]:
+        self.logger.error(f"Orchestrator Error: Failed to generate plan: {error}", exc_info=True)
+        self.logger.error(f"Raw Response: {response}")
+        self._record_plan_source("llm_error", started_at)
+        fallback_message = "I encountered an error while trying to create a plan to answer your query. I will do my best to answer directly."
+        return {
+            "steps": [
+                {
+                    "agent": "synthesis",
+                    "task": {
+                        "message": fallback_message
+                    }
+                }
+            ]
+        }
+
     def get_plan_from_orchestrator(self, user_query: str, conversation_history: list = None) -> Dict[str, Any]:
         self.logger.info(f"Getting plan for user query: {user_query}.")
+        started_at = time.perf_counter()
         now = datetime.datetime.now()
 
-        system_instructions = ORCHESTRATOR_PROMPT_TEMPLATE.format(current_date_iso=now.isoformat())
+        plan, cache_key = self._plan_without_llm(user_query, conversation_history, now, started_at)
+        if plan is not None:
+            return plan
 
         response = None
         try:
-            messages = [{"role": "system", "content": system_instructions}]
-            messages.extend(EXAMPLES)
-
-            if conversation_history:
-                for message in conversation_history:
-                    messages.append({"role": message["role"], "content": message["content"]})
-
-            messages.append({"role": "user", "content": user_query})
-
             response = self.llm_service.create_completion(
-                messages=messages,
+                messages=self._build_messages(user_query, conversation_history, now),
                 max_tokens=1024,
                 temperature=0.01,
                 response_format={
@@ -39,30 +104,39 @@ class AgentOrchestrator:
                     "schema": PLAN_SCHEMA
                 }
             )
+            plan = self._parse_plan(response, started_at)
+            self._cache_plan(cache_key, plan)
+            return plan
+        except Exception as e:
+            return self._fallback_plan(e, response, started_at)
 
-            json_str = response.choices[0].message.content.strip()
+    async def aget_plan_from_orchestrator(self, user_query: str, conversation_history: list = None) -> Dict[str, Any]:
+        self.logger.info(f"Getting plan asynchronously for user query: {user_query}.")
+        started_at = time.perf_counter()
+        now = datetime.datetime.now()
 
-            if "```" in json_str:
-                json_str = json_str.replace("```json", "").replace("```", "")
+        # With PLAN_CACHE_PERSIST the cache reads and writes SQLite, so it is used off the event loop.
+        plan, cache_key = await asyncio.to_thread(self._plan_without_llm, user_query, conversation_history, now,
+                                                  started_at)
+        if plan is not None:
+            return plan
 
-            json_str = re.sub(r'\s+', ' ', json_str).strip()
-            plan = json.loads(json_str)
-            self.logger.info(f"Orchestrator Generated Plan: {plan}")
+        response = None
+        try:
+            response = await self.llm_service.acreate_completion(
+                messages=self._build_messages(user_query, conversation_history, now),
+                max_tokens=1024,
+                temperature=0.01,
+                response_format={
+                    "type": "json_object",
+                    "schema": PLAN_SCHEMA
+                }
+            )
+            plan = self._parse_plan(response, started_at)
+            await asyncio.to_thread(self._cache_plan, cache_key, plan)
             return plan
         except Exception as e:
-            self.logger.error(f"Orchestrator Error: Failed to generate plan: {e}", exc_info=True)
-            self.logger.error(f"Raw Response: {response}")
-            fallback_message = "I encountered an error while trying to create a plan to answer your query. I will do my best to answer directly."
-            return {
-                "steps": [
-                    {
-                        "agent": "synthesis",
-                        "task": {
-                            "message": fallback_message
-                        }
-                    }
-                ]
-            }
+            return self._fallback_plan(e, response, started_at)
 
 
 if __name__ == "__main__":
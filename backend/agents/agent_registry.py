@@ -0,0 +1,78 @@
+from typing import Dict, Optional, TYPE_CHECKING
+import logging
+import threading
+
+from agents.llm_models.model_registry import DEFAULT_MODEL_ID, ALLOWED_MODEL_IDS
+
+if TYPE_CHECKING:
+    from agents.main_agent import MainAgent
+    from agents.agent_retrieval import AgentRetrieval
+    from agents.agent_analysis import AgentAnalysis
+
+
+class AgentRegistry:
+    """
+    Process-wide registry that builds one MainAgent per model_id and reuses it across requests.
+    Retrieval and analysis agents do not depend on the model, so all MainAgents share them.
+    The agent modules (pandas, sklearn, chromadb, torch) are imported on the first build, not at import time.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._agents: Dict[str, "MainAgent"] = {}
+        self._agent_retrieval: Optional["AgentRetrieval"] = None
+        self._agent_analysis: Optional["AgentAnalysis"] = None
+
+    def get_agent(self, model_id: str = None) -> "MainAgent":
+        resolved_model_id = model_id or DEFAULT_MODEL_ID
+        if resolved_model_id not in ALLOWED_MODEL_IDS:
+            raise ValueError(
+                f"Unsupported model_id '{resolved_model_id}'. Allowed: {sorted(ALLOWED_MODEL_IDS)}"
+            )
+
+        agent = self._agents.get(resolved_model_id)
+        if agent is not None:
+            return agent
+
+        with self._lock:
+            agent = self._agents.get(resolved_model_id)
+            if agent is None:
+                agent = self._build_agent(resolved_model_id)
+                self._agents[resolved_model_id] = agent
+        return agent
+
+    def _build_agent(self, model_id: str) -> "MainAgent":
+        from agents.main_agent import MainAgent
+        from agents.agent_retrieval import AgentRetrieval
+        from agents.agent_analysis import AgentAnalysis
+
+        self.logger.info(f"AgentRegistry: Building agents for model: {model_id}")
+        if self._agent_retrieval is None:
+            self._agent_retrieval = AgentRetrieval()
+        if self._agent_analysis is None:
+            self._agent_analysis = AgentAnalysis()
+
+        return MainAgent(
+            model_id=model_id,
+            agent_retrieval=self._agent_retrieval,
+            agent_analysis=self._agent_analysis,
+        )
+
+    def loaded_model_ids(self) -> list:
+        return sorted(self._agents.keys())
+
+    async def aclose(self) -> None:
+        """Lets every agent finish or cancel its background work; call before clear() at shutdown."""
+        for agent in list(self._agents.values()):
+            await agent.aclose()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._agents.clear()
+            self._agent_retrieval = None
+            self._agent_analysis = None
+        self.logger.info("AgentRegistry: Cleared all cached agents.")
+
+
+agent_registry = AgentRegistry()
@@ -1,44 +1,234 @@
-from repositories.vector_chroma_db.chroma_client import ChromaClient
+from repositories.vector_chroma_db.chroma_client import ChromaClient, CHROMA_PAGE_SIZE, SIMILARITY_THRESHOLD
+from repositories.vector_chroma_db.retrieval_result import RetrievalResult
+from repositories.vector_chroma_db.bm25_index import BM25Index, get_bm25_index, tokenize
+from repositories.vector_chroma_db.cause_clustering import assign_nearest_clusters
+from repositories.sql_databases import cause_clusters_repo, downtime_logs_repo, downtime_rollups_repo
+from agents.agent_analysis import DEFAULT_REQUIRED_FIELDS, PUSHDOWN_ANALYSES, STREAMING_ANALYSES
+from typing import Iterator, List, Optional
 import logging
+import os
+import pandas as pd
+
+# Candidates taken from each ranking (vector and BM25) before reciprocal rank fusion.
+HYBRID_CANDIDATE_POOL = int(os.getenv("HYBRID_CANDIDATE_POOL", "30"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Queries of at most this many tokens that all occur in the notes are answered by BM25 alone, without embedding.
+LEXICAL_FAST_PATH_MAX_TOKENS = int(os.getenv("LEXICAL_FAST_PATH_MAX_TOKENS", "3"))
+# Results returned per query type unless the consuming analysis asks for a larger pool (see candidate_pool).
+DEFAULT_N_RESULTS = {
+    'semantic_query': int(os.getenv("SEMANTIC_QUERY_N_RESULTS", "10")),
+    'hybrid_query': int(os.getenv("HYBRID_QUERY_N_RESULTS", "5")),
+    'known_issue_query': int(os.getenv("KNOWN_ISSUE_QUERY_N_RESULTS", "3")),
+}
 
 
 class AgentRetrieval:
     def __init__(self):
         self.downtime_logs_client = ChromaClient(collection_name="downtime_logs")
         self.known_issues_client = ChromaClient(collection_name="known_issues")
+        self.similarity_threshold = SIMILARITY_THRESHOLD
         self.logger = logging.getLogger(__name__)
 
-    def retrieve_data(self, task):
+    def _resolve_include(self, include):
+        if 'clusters' in include and not cause_clusters_repo.has_clusters():
+            # No precomputed cause clusters yet: fetch embeddings so the analysis can cluster at query time.
+            self.logger.info("AgentRetrieval: No stored cause clusters, fetching embeddings instead.")
+            return [field for field in include if field != 'clusters'] + ['embeddings']
+        return include
+
+    def _with_clusters(self, result: RetrievalResult, include) -> RetrievalResult:
+        """Adds the stored cause cluster of each Chroma record; the 'clusters' field only lives in the analytics store."""
+        if 'clusters' not in include or result.empty:
+            return result
+        assignments = cause_clusters_repo.get_assignments(result.frame['ids'].tolist())
+        result.frame = result.frame.merge(assignments, on='ids', how='left')
+        return result
+
+    def _assign_missing_clusters(self, result: RetrievalResult, include) -> RetrievalResult:
+        """
+        Logs ingested since the last clustering run have no stored cause cluster; they are put in the nearest stored
+        cluster so cluster_and_aggregate still counts them. The background job later moves the centroids for them.
+        """
+        if 'clusters' not in include or result.empty or 'cluster_id' not in result.frame.columns:
+            return result
+        frame = result.frame
+        missing = frame['cluster_id'].isna() & frame['documents'].notna() & (frame['documents'] != '')
+        if not missing.any():
+            return result
+
+        assigned = assign_nearest_clusters(self.downtime_logs_client, frame.loc[missing, 'ids'].tolist())
+        if not assigned.empty:
+            assigned = assigned.set_index('ids')
+            frame = frame.copy()
+            frame.loc[missing, 'cluster_id'] = frame.loc[missing, 'ids'].map(assigned['cluster_id'])
+            frame.loc[missing, 'cluster_label'] = frame.loc[missing, 'ids'].map(assigned['cluster_label'])
+            result = RetrievalResult(frame=frame, embeddings=result.embeddings)
+        self.logger.info(f"AgentRetrieval: Assigned {len(assigned)} of {int(missing.sum())} unclustered logs to the "
+                         f"nearest stored cause cluster.")
+        return result
+
+    def _get_metadata_logs(self, chroma_filters, include):
+        # Only Chroma holds the note embeddings; everything else is served by the analytics store.
+        if 'embeddings' not in include and downtime_logs_repo.is_populated():
+            try:
+                return RetrievalResult(frame=downtime_logs_repo.get_logs(where=chroma_filters, include=include))
+            except downtime_logs_repo.UnsupportedFilterError as e:
+                self.logger.warning(f"AgentRetrieval: Falling back to ChromaDB, filter not supported by analytics store: {e}")
+        return self._query_downtime_logs(None, chroma_filters, include)
+
+    def _query_downtime_logs(self, query_text, chroma_filters, include, n_results: int = None):
+        chroma_include = [field for field in include if field != 'clusters']
+        if query_text is None:
+            result = self.downtime_logs_client.get_items(where=chroma_filters, include=chroma_include)
+        else:
+            result = self.downtime_logs_client.query_items(query_texts=[query_text], n_results=n_results,
+                                                           where=chroma_filters, include=chroma_include,
+                                                           min_similarity=self.similarity_threshold)
+        return self._with_clusters(result, include)
+
+    def aggregate_downtime(self, task, analysis_types: list) -> Optional[dict]:
+        """
+        Runs a metadata_query and the PUSHDOWN_ANALYSES that consume it as one aggregate inside the analytics store,
+        so only {'by_line': [{'line', 'downtime_minutes', 'event_count'}], 'top_logs': [...]} comes back instead of
+        every matching log. Date-range/line filters are answered from the rollups, other filters by a SUM/COUNT
+        GROUP BY line over the raw rows. Returns None when the logs have to be fetched (Chroma only, other analyses).
+        """
+        if task.get('type') != 'metadata_query' or not analysis_types:
+            return None
+        if any(analysis_type not in PUSHDOWN_ANALYSES for analysis_type in analysis_types):
+            return None
+        if not downtime_logs_repo.is_populated():
+            return None
+
+        filters = task.get('filters') or None
+        source = "rollups"
+        by_line = downtime_rollups_repo.aggregate_downtime(filters)
+        try:
+            if by_line is None:
+                source = "analytics store"
+                by_line = downtime_logs_repo.aggregate_by_line(filters)
+            top_logs = []
+            if 'calculate_total_downtime' in analysis_types:
+                top_logs = downtime_logs_repo.get_top_logs(filters, limit=5)
+        except downtime_logs_repo.UnsupportedFilterError as e:
+            self.logger.warning(f"AgentRetrieval: Cannot push down aggregate, filter not supported by analytics store: {e}")
+            return None
+        self.logger.info(f"AgentRetrieval: Pushed down {analysis_types} for filters '{filters}' to the {source}.")
+        return {"by_line": by_line, "top_logs": top_logs}
+
+    @staticmethod
+    def _reciprocal_rank_fusion(rankings: List[RetrievalResult], limit: int) -> RetrievalResult:
+        """Merges ranked results by summed 1 / (HYBRID_RRF_K + rank); a log found by both rankings keeps its first row."""
+        scores = {}
+        for ranking in rankings:
+            for rank, log_id in enumerate(ranking.frame['ids'] if not ranking.empty else []):
+                scores[log_id] = scores.get(log_id, 0.0) + 1.0 / (HYBRID_RRF_K + rank + 1)
+        frames = [ranking.frame for ranking in rankings if not ranking.empty]
+        if not frames:
+            return RetrievalResult()
+        fused = pd.concat(frames, ignore_index=True).drop_duplicates('ids')
+        order = fused['ids'].map(scores).sort_values(ascending=False, kind='stable').index
+        return RetrievalResult(frame=fused.loc[order].head(limit).reset_index(drop=True))
+
+    def _lexical_logs(self, index: BM25Index, query_text, chroma_filters, include, limit: int,
+                      require_all: bool = False) -> RetrievalResult:
+        ranked_notes = [note for note, _ in index.search(query_text, HYBRID_CANDIDATE_POOL, require_all=require_all)]
+        return RetrievalResult(frame=downtime_logs_repo.get_logs_for_notes(ranked_notes, chroma_filters, include, limit))
+
+    def _search_downtime_logs(self, query_text, chroma_filters, include, n_results: int) -> RetrievalResult:
+        """
+        Semantic/hybrid retrieval over the downtime logs. Short queries whose tokens all occur in the notes
+        ("pogo pin", "PLC/HMI") are answered from the BM25 index alone; otherwise the BM25 and vector rankings are
+        combined with reciprocal rank fusion. Without an index (or when embeddings are needed) only Chroma is used.
+        """
+        index = None if 'embeddings' in include else get_bm25_index()
+        if index is None or not downtime_logs_repo.is_populated():
+            return self._query_downtime_logs(query_text, chroma_filters, include, n_results=n_results)
+
+        pool_size = max(HYBRID_CANDIDATE_POOL, n_results)
+        terms = tokenize(query_text)
+        try:
+            if len(terms) <= LEXICAL_FAST_PATH_MAX_TOKENS and index.has_terms(terms):
+                exact_matches = self._lexical_logs(index, query_text, chroma_filters, include, n_results,
+                                                   require_all=True)
+                if len(exact_matches) >= n_results:
+                    self.logger.info(f"AgentRetrieval: Answered '{query_text}' from the BM25 index alone.")
+                    return exact_matches
+            lexical = self._lexical_logs(index, query_text, chroma_filters, include, pool_size)
+        except downtime_logs_repo.UnsupportedFilterError as e:
+            self.logger.warning(f"AgentRetrieval: Skipping BM25, filter not supported by analytics store: {e}")
+            return self._query_downtime_logs(query_text, chroma_filters, include, n_results=n_results)
+
+        semantic = self._query_downtime_logs(query_text, chroma_filters, include, n_results=pool_size)
+        return self._reciprocal_rank_fusion([semantic, lexical], n_results)
+
+    @staticmethod
+    def can_stream(task, analysis_types: list) -> bool:
+        """Whether a retrieval task can be read page by page because every analysis consuming it aggregates."""
+        return (task.get('type') == 'metadata_query' and bool(analysis_types)
+                and all(analysis_type in STREAMING_ANALYSES for analysis_type in analysis_types))
+
+    def iter_data(self, task, include: list = None, page_size: int = CHROMA_PAGE_SIZE) -> Iterator[RetrievalResult]:
+        """
+        Streams the logs of a metadata_query in pages of at most `page_size` rows, from the analytics store when it
+        can run the filter and from ChromaDB otherwise.
+        """
+        include = include or DEFAULT_REQUIRED_FIELDS
+        chroma_filters = task.get('filters') or None
+        if task.get('type') != 'metadata_query':
+            raise ValueError(f"Only 'metadata_query' tasks can be streamed, got '{task.get('type')}'")
+        self.logger.info(f"AgentRetrieval: Streaming logs for filters '{chroma_filters}' with fields {include}")
+
+        if 'embeddings' not in include and downtime_logs_repo.is_populated():
+            try:
+                downtime_logs_repo.where_to_sql(chroma_filters)
+            except downtime_logs_repo.UnsupportedFilterError as e:
+                self.logger.warning(f"AgentRetrieval: Falling back to ChromaDB, filter not supported by analytics store: {e}")
+            else:
+                for frame in downtime_logs_repo.iter_logs(where=chroma_filters, include=include, page_size=page_size):
+                    yield RetrievalResult(frame=frame)
+                return
+        yield from self.downtime_logs_client.iter_items(where=chroma_filters, page_size=page_size, include=include)
+
+    def retrieve_data(self, task, include: list = None, n_results: int = None) -> RetrievalResult:
+        """
+        Runs a retrieval task. `include` lists the record fields the next analysis needs
+        ('documents', 'metadatas', 'embeddings', 'clusters'); fields outside it are not fetched.
+        `n_results` overrides DEFAULT_N_RESULTS for similarity searches; results below the similarity threshold are dropped.
+        """
+        include = self._resolve_include(include or DEFAULT_REQUIRED_FIELDS)
         task_type = task.get('type')
+        n_results = n_results or DEFAULT_N_RESULTS.get(task_type)
         filters = task.get('filters', None)
         query_text = task.get('query_text')
         chroma_filters = filters if filters else None
 
         self.logger.info(
-            f"AgentRetrieval: Retrieving data for task type '{task_type}' with query '{query_text}' and filters '{chroma_filters}'")
+            f"AgentRetrieval: Retrieving data for task type '{task_type}' with query '{query_text}', filters '{chroma_filters}' and fields {include}")
 
         if task_type == 'metadata_query':
-            return self.downtime_logs_client.get_items(where=chroma_filters)
+            return self._assign_missing_clusters(self._get_metadata_logs(chroma_filters, include), include)
 
         elif task_type == 'known_issue_query':
             if not query_text:
                 self.logger.error("AgentRetrieval: 'query_text' is required for 'known_issue_query'.")
                 raise ValueError("'query_text' is required for 'known_issue_query'")
-            return self.known_issues_client.query_items(query_texts=[query_text], n_results=3, where=chroma_filters)
+            return self.known_issues_client.query_items(query_texts=[query_text], n_results=n_results,
+                                                        where=chroma_filters, min_similarity=self.similarity_threshold)
 
         elif task_type == 'semantic_query':
             if not query_text:
                 self.logger.error("AgentRetrieval: 'query_text' is required for 'semantic_query'.")
                 raise ValueError("'query_text' is required for 'semantic_query'")
-            return self.downtime_logs_client.query_items(query_texts=[query_text], n_results=10,
-                                                          where=chroma_filters)
+            return self._assign_missing_clusters(
+                self._search_downtime_logs(query_text, chroma_filters, include, n_results=n_results), include)
 
         elif task_type == 'hybrid_query':
             if not query_text:
                 self.logger.error("AgentRetrieval: 'query_text' is required for 'hybrid_query'.")
                 raise ValueError("'query_text' is required for 'hybrid_query'")
-            return self.downtime_logs_client.query_items(query_texts=[query_text], n_results=5,
-                                                          where=chroma_filters)
+            return self._assign_missing_clusters(
+                self._search_downtime_logs(query_text, chroma_filters, include, n_results=n_results), include)
         else:
             self.logger.warning(f"AgentRetrieval: Unknown task type '{task_type}'")
             raise ValueError(f"Unknown task type: {task_type}")
@@ -3,6 +3,7 @@ from agents.llm_models.model_registry import DEFAULT_MODEL_ID
 from repositories.sql_databases.conversations_repo import add_message
 from agents.utils.synthesizer_prompt import SYNTHESIZER_PROMPT_TEMPLATE
 from agents.utils.schemas import RequestContext
+import asyncio
 import logging
 import json
 
@@ -12,7 +13,8 @@ class AgentSynthesis:
         self.logger = logging.getLogger(__name__)
         self.llm_service = HuggingFaceInferenceService(model_id=model_id or DEFAULT_MODEL_ID)
 
-    def stream_final_response(self, query: str, data: dict, context: RequestContext, conversation_history: list = None):
+    async def stream_final_response(self, query: str, data: dict, context: RequestContext,
+                                    conversation_history: list = None):
         system_prompt = SYNTHESIZER_PROMPT_TEMPLATE
         synthesis_prompt = f"""
                 A user asked: '{query}'
@@ -28,7 +30,7 @@ class AgentSynthesis:
         self.logger.info(f"AgentSynthesizer: Synthesis messages for LLM:")
         accumulated_response = ""
         try:
-            response = self.llm_service.create_completion(
+            response = await self.llm_service.acreate_completion(
                 messages=messages,
                 max_tokens=1000,
                 temperature=0.7,
@@ -36,7 +38,7 @@ class AgentSynthesis:
             )
 
             self.logger.info("AgentSynthesizer: Streaming response initiated.")
-            for chunk in response:
+            async for chunk in response:
                 try:
                     content = chunk.choices[0].delta.content
                 except Exception:
@@ -46,7 +48,8 @@ class AgentSynthesis:
                     payload = {"type": "chunk", "content": content}
                     yield f"data: {json.dumps(payload)}\n\n"
             yield "data: {\"type\":\"done\"}\n\n"
-            add_message(
+            await asyncio.to_thread(
+                add_message,
                 conversation_id=context.conversation_id,
                 session_id=context.session_id,
                 role='assistant',
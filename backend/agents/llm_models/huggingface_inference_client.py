@@ -1,5 +1,5 @@
-from typing import List, Dict, Generator, Any, Union
-from huggingface_hub import InferenceClient
+from typing import List, Dict, Generator, AsyncIterator, Any, Union
+from huggingface_hub import InferenceClient, AsyncInferenceClient
 import logging
 import os
 from dotenv import load_dotenv
@@ -31,6 +31,7 @@ class HuggingFaceInferenceService:
         self.api_key = get_api_key()
         try:
             self.client = InferenceClient(model=self.model_id, api_key=self.api_key)
+            self.async_client = AsyncInferenceClient(model=self.model_id, api_key=self.api_key)
             self.logger.info(f"InferenceClient initialized for model: {self.model_id}")
         except Exception as e:
             self.logger.error(f"Failed to initialize InferenceClient: {e}")
@@ -64,3 +65,37 @@ class HuggingFaceInferenceService:
             if stream:
                 return (i for i in [])
             raise
+
+    async def acreate_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        response_format: dict = None,
+        stream: bool = False,
+    ) -> Union[AsyncIterator[Any], Any]:
+        """
+        Async counterpart of create_completion backed by AsyncInferenceClient.
+        With stream=True the result is an async iterator of chunks.
+        """
+        self.logger.info(f"Creating async completion with model {self.model_id}, stream={stream}")
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model_id,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                response_format=response_format,
+                stream=stream,
+            )
+            return response
+        except Exception as e:
+            self.logger.error(f"Error during async chat completion API call: {e}")
+            if stream:
+                return _empty_async_stream()
+            raise
+
+
+async def _empty_async_stream():
+    return
+    yield
@@ -9,3 +9,14 @@ ALLOWED_MODEL_IDS = {
     "google/gemma-7b-it",
     "dphn/Dolphin-Mistral-24B-Venice-Edition",
 }
+
+
+# Token budget for conversation history sent with each prompt. Older turns are folded into a rolling summary.
+DEFAULT_HISTORY_TOKEN_BUDGET = 1500
+
+HISTORY_TOKEN_BUDGETS = {
+    "meta-llama/Llama-3.1-8B-Instruct": 2000,
+    "mistralai/Mistral-7B-Instruct-v0.3": 1500,
+    "google/gemma-7b-it": 1000,
+    "dphn/Dolphin-Mistral-24B-Venice-Edition": 2000,
+}
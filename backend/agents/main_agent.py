@@ -1,46 +1,104 @@
-from typing import Generator
+from typing import AsyncGenerator
+import asyncio
 import json
 import logging
-import pandas as pd
+import os
 from agents.utils.schemas import RequestContext
 from agents.utils.date_converter import convert_dates_in_plan
+from agents.utils.conversation_context import ConversationContextManager
 from repositories.sql_databases import conversations_repo
+from repositories.vector_chroma_db.retrieval_result import RetrievalResult
 from agents.agent_orchestrator import AgentOrchestrator
 from agents.agent_retrieval import AgentRetrieval
-from agents.agent_analysis import AgentAnalysis
+from agents.agent_analysis import AgentAnalysis, candidate_pool, required_fields
 from agents.agent_synthesis import AgentSynthesis
 
+# How long shutdown waits for pending rolling-summary updates before cancelling them.
+SUMMARY_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SUMMARY_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
 
 class MainAgent:
-    def __init__(self, model_id: str = None):
+    def __init__(self, model_id: str = None, agent_retrieval: AgentRetrieval = None,
+                 agent_analysis: AgentAnalysis = None):
         self.logger = logging.getLogger(__name__)
         self.name = "MainAgent"
         self.model_id = model_id
         self.agent_orchestrator = AgentOrchestrator(model_id=model_id)
-        self.agent_retrieval = AgentRetrieval()
-        self.agent_analysis = AgentAnalysis()
+        self.agent_retrieval = agent_retrieval or AgentRetrieval()
+        self.agent_analysis = agent_analysis or AgentAnalysis()
         self.agent_synthesizer = AgentSynthesis(model_id=model_id)
+        self.context_manager = ConversationContextManager(
+            model_id=self.agent_orchestrator.model_id,
+            llm_service=self.agent_synthesizer.llm_service,
+        )
+        self._background_tasks = set()
+
+    def _schedule_summary_update(self, context: RequestContext, history_messages: list, summary_state: dict) -> None:
+        task = asyncio.create_task(self.context_manager.aupdate_summary(
+            context.conversation_id, context.session_id, history_messages, summary_state))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def aclose(self, timeout: float = SUMMARY_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Waits up to `timeout` for pending summary updates and cancels the ones still running."""
+        pending = set(self._background_tasks)
+        if not pending:
+            return
+        self.logger.info(f"{self.name}: Waiting for {len(pending)} pending summary updates...")
+        _, still_running = await asyncio.wait(pending, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            await asyncio.gather(*still_running, return_exceptions=True)
+            self.logger.warning(f"{self.name}: Cancelled {len(still_running)} summary updates at shutdown.")
 
-    def process_query(self, query: str, context: RequestContext) -> Generator[str, None, None]:
+    @staticmethod
+    def _consuming_analysis_types(steps: list, retrieval_index: int) -> list:
+        """Looks ahead from a retrieval step to the analyses that will consume its data."""
+        analysis_types = []
+        for step in steps[retrieval_index + 1:]:
+            if step.get('agent') == 'retrieval':
+                break
+            if step.get('agent') == 'analysis':
+                analysis_types.append((step.get('task') or {}).get('type'))
+        return analysis_types
+
+    async def process_query(self, query: str, context: RequestContext) -> AsyncGenerator[str, None]:
+        """
+        Runs the orchestrator -> retrieval -> analysis -> synthesis pipeline on the event loop.
+        LLM calls are awaited on the async inference client; blocking SQLite, Chroma and pandas/sklearn
+        work runs in worker threads so a single worker can serve many concurrent streams.
+        """
         agent_name_in_error = None
         analysis_for_synthesis = {}
-        retrieved_data = pd.DataFrame()
+        retrieved_data = RetrievalResult()
+        aggregates = None
+        streamed_task = None
         limited_conversation_history = []
         try:
             self.logger.info(f"{self.name}: processing query: {query} for context: {context}")
             self.logger.info(f"{self.name}: data: {json.dumps({'type': 'conversation_id', 'id': context.conversation_id})}")
 
-            conversations_repo.add_message(context.conversation_id, context.session_id, 'user', query)
+            await asyncio.to_thread(conversations_repo.add_message, context.conversation_id, context.session_id,
+                                    'user', query)
 
-            conversation_history_list = conversations_repo.get_messages_by_conversation_id(
+            summary_state = await asyncio.to_thread(
+                conversations_repo.get_conversation_summary,
                 context.conversation_id,
                 context.session_id)
-            limited_conversation_history = conversation_history_list[-25:]
+            history_messages = await asyncio.to_thread(
+                conversations_repo.get_unsummarized_messages,
+                context.conversation_id,
+                context.session_id,
+                summary_state.get("summarized_message_id"))
+            limited_conversation_history = await asyncio.to_thread(
+                self.context_manager.build_context, history_messages, summary_state.get("summary"),
+                summary_state.get("summarized_message_id"))
 
-            plan = self.agent_orchestrator.get_plan_from_orchestrator(query, limited_conversation_history)
+            plan = await self.agent_orchestrator.aget_plan_from_orchestrator(query, limited_conversation_history)
             self.logger.info(f"Plan from orchestrator: {plan}")
 
-            plan = convert_dates_in_plan(plan)
+            plan = await asyncio.to_thread(convert_dates_in_plan, plan)
             self.logger.info(f"Plan after date conversion: {plan}")
             for i, step in enumerate(plan['steps']):
                 agent_name = step.get('agent')
@@ -50,11 +108,35 @@ class MainAgent:
 
                 if agent_name == 'retrieval':
                     self.logger.info(f"Retrieval step with task: {task}")
-                    retrieved_data = self.agent_retrieval.retrieve_data(task)
-                    self.logger.info(f"Agent Retrieval data: {retrieved_data}")
+                    analysis_types = self._consuming_analysis_types(plan['steps'], i)
+                    # Retrieval and totals-only analyses are fused into one aggregate run where the data lives;
+                    # the matching logs themselves are not fetched.
+                    aggregates = await asyncio.to_thread(self.agent_retrieval.aggregate_downtime, task, analysis_types)
+                    streamed_task = None
+                    retrieved_data = RetrievalResult()
+                    if aggregates is not None:
+                        self.logger.info(f"Agent Retrieval aggregates: {aggregates}")
+                    elif self.agent_retrieval.can_stream(task, analysis_types):
+                        # The analyses read the logs page by page instead of one frame holding every match.
+                        streamed_task = task
+                        self.logger.info("Agent Retrieval: logs will be streamed to the analysis.")
+                    else:
+                        include = required_fields(analysis_types[0] if analysis_types else None)
+                        retrieved_data = await asyncio.to_thread(self.agent_retrieval.retrieve_data, task, include,
+                                                                 candidate_pool(analysis_types))
+                        self.logger.info(f"Agent Retrieval data: {retrieved_data.frame}")
 
                 elif agent_name == 'analysis':
-                    analysis_result = self.agent_analysis.execute_analysis_task(task, retrieved_data)
+                    if aggregates is not None:
+                        analysis_result = await asyncio.to_thread(self.agent_analysis.summarize_aggregates, task,
+                                                                  aggregates)
+                    elif streamed_task is not None:
+                        pages = self.agent_retrieval.iter_data(streamed_task, required_fields(task.get('type')))
+                        analysis_result = await asyncio.to_thread(self.agent_analysis.execute_streaming_analysis, task,
+                                                                  pages)
+                    else:
+                        analysis_result = await asyncio.to_thread(self.agent_analysis.execute_analysis_task, task,
+                                                                  retrieved_data)
                     analysis_for_synthesis.update(analysis_result)
                     self.logger.info(f"Analysis Agent Result: {analysis_result}")
                     self.logger.info(f"Final Data for Synthesis: {analysis_for_synthesis}")
@@ -65,8 +147,9 @@ class MainAgent:
                         synthesis_data.update(task)
                     final_answer = self.agent_synthesizer.stream_final_response(query, synthesis_data,
                                                                                 context, limited_conversation_history)
-                    for chunk in final_answer:
+                    async for chunk in final_answer:
                         yield chunk
+                    self._schedule_summary_update(context, history_messages, summary_state)
                     return
                 agent_name_in_error = None
         except Exception as e:
@@ -75,7 +158,7 @@ class MainAgent:
                 analysis_for_synthesis['error'] = f"An unexpected error occurred in the {agent_name_in_error} agent."
                 final_answer = self.agent_synthesizer.stream_final_response(query, analysis_for_synthesis, context,
                                                                             limited_conversation_history)
-                for chunk in final_answer:
+                async for chunk in final_answer:
                     yield chunk
             else:
                 self.logger.error(f"{self.name}: Error processing query: {e}", exc_info=True)
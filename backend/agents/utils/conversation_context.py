@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agents.llm_models.huggingface_inference_client import HuggingFaceInferenceService, get_api_key
+from agents.llm_models.model_registry import DEFAULT_HISTORY_TOKEN_BUDGET, HISTORY_TOKEN_BUDGETS
+from repositories.sql_databases import conversations_repo
+
+SUMMARY_MAX_TOKENS = 300
+MESSAGE_TOKEN_OVERHEAD = 4
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a manufacturing operator and a downtime analysis assistant.
+Update the existing summary with the new messages. Keep the production lines, dates, figures, findings and open
+questions that later turns may refer to. Drop greetings and formatting. Answer with the updated summary only,
+in at most 150 words.
+"""
+
+_token_counters: Dict[str, Callable[[str], int]] = {}
+_token_counters_lock = threading.Lock()
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def get_token_counter(model_id: str) -> Callable[[str], int]:
+    """
+    Returns a function that counts tokens with the model's own tokenizer.
+    Falls back to a characters/4 estimate when the tokenizer cannot be loaded (offline or gated model).
+    """
+    counter = _token_counters.get(model_id)
+    if counter is not None:
+        return counter
+
+    with _token_counters_lock:
+        counter = _token_counters.get(model_id)
+        if counter is None:
+            try:
+                from transformers import AutoTokenizer
+                tokenizer = AutoTokenizer.from_pretrained(model_id, token=get_api_key())
+                counter = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+            except Exception as e:
+                logging.getLogger(__name__).warning(
+                    f"Could not load tokenizer for {model_id}, estimating token counts instead: {e}")
+                counter = _estimate_tokens
+            _token_counters[model_id] = counter
+    return counter
+
+
+class ConversationContextManager:
+    """
+    Builds the conversation history sent to the LLMs within a per-model token budget.
+    The most recent turns are kept verbatim; older turns are folded into a rolling summary stored on the conversation.
+    A turn only leaves the prompt once the summary covers it, so the prompt can exceed the budget while a summary
+    update is pending or has failed.
+    """
+
+    def __init__(self, model_id: str, llm_service: HuggingFaceInferenceService, token_budget: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.model_id = model_id
+        self.llm_service = llm_service
+        self.token_budget = token_budget or HISTORY_TOKEN_BUDGETS.get(model_id, DEFAULT_HISTORY_TOKEN_BUDGET)
+
+    def count_tokens(self, text: str) -> int:
+        return get_token_counter(self.model_id)(text) + MESSAGE_TOKEN_OVERHEAD
+
+    def split_history(self, messages: List[dict], summary: Optional[str] = None) -> Tuple[List[dict], List[dict]]:
+        """Splits messages (oldest first) into (older, verbatim) so the verbatim tail plus summary fits the budget."""
+        remaining_budget = self.token_budget - (self.count_tokens(summary) if summary else 0)
+        verbatim_start = len(messages)
+        for index in range(len(messages) - 1, -1, -1):
+            tokens = self.count_tokens(messages[index]["content"])
+            # The newest message is always kept, even when it alone exceeds the budget.
+            if tokens > remaining_budget and index != len(messages) - 1:
+                break
+            remaining_budget -= tokens
+            verbatim_start = index
+        return messages[:verbatim_start], messages[verbatim_start:]
+
+    def build_context(self, messages: List[dict], summary: Optional[str] = None,
+                      summarized_message_id: int = 0) -> List[dict]:
+        """Summary plus every message newer than `summarized_message_id`; older ones are already in the summary."""
+        unsummarized = [message for message in messages if message.get("id", 0) > (summarized_message_id or 0)]
+        older, verbatim = self.split_history(unsummarized, summary)
+        context = []
+        if summary:
+            context.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        context.extend({"role": message["role"], "content": message["content"]} for message in unsummarized)
+        if older:
+            self.logger.info(f"ConversationContext: Keeping {len(older)} messages beyond the {self.token_budget} "
+                             f"token budget until the summary folds them in.")
+        self.logger.info(f"ConversationContext: Keeping {len(unsummarized)} of {len(messages)} messages verbatim "
+                         f"({len(verbatim)} within the budget, summary: {bool(summary)}).")
+        return context
+
+    async def aupdate_summary(self, conversation_id: str, session_id: str, messages: List[dict],
+                              summary_state: dict) -> None:
+        """
+        Folds messages that no longer fit the verbatim window into the stored rolling summary.
+        Only messages newer than the last summarized message id are sent, so each turn costs one small LLM call at most.
+        """
+        summary = summary_state.get("summary")
+        summarized_message_id = summary_state.get("summarized_message_id") or 0
+
+        older, _ = self.split_history(messages, summary)
+        new_messages = [message for message in older if message.get("id", 0) > summarized_message_id]
+        if not new_messages:
+            return
+
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in new_messages)
+        prompt = f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+        try:
+            response = await self.llm_service.acreate_completion(
+                messages=[{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": prompt}],
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.2,
+            )
+            updated_summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            self.logger.error(f"ConversationContext: Failed to update summary for {conversation_id}: {e}")
+            return
+
+        await asyncio.to_thread(
+            conversations_repo.update_conversation_summary,
+            conversation_id,
+            session_id,
+            updated_summary,
+            max(message["id"] for message in new_messages),
+        )
+        self.logger.info(f"ConversationContext: Folded {len(new_messages)} messages into the summary of {conversation_id}.")
@@ -1,12 +1,13 @@
 import datetime
-import dateparser
 import logging
+from agents.utils.date_resolver import resolve_date_phrase
 
 logger = logging.getLogger(__name__)
 
 
 def convert_dates_in_plan(plan):
     logger.info("⚙️ [Pre-processor] Scanning plan for natural language dates...")
+    now = datetime.datetime.now()
 
     for step in plan['steps']:
         if step['agent'] == 'retrieval':
@@ -40,7 +41,7 @@ def convert_dates_in_plan(plan):
             end_dt = None
             parse_success = True
             try:
-                start_dt = dateparser.parse(start_str, settings={'RELATIVE_BASE': datetime.datetime.now()})
+                start_dt = resolve_date_phrase(start_str, now)
                 if start_dt is None:
                     logger.info(f"⚠️ [Pre-processor] Failed to parse START date: '{start_str}'")
                     parse_success = False
@@ -49,7 +50,7 @@ def convert_dates_in_plan(plan):
                 parse_success = False
 
             try:
-                end_dt = dateparser.parse(end_str, settings={'RELATIVE_BASE': datetime.datetime.now()})
+                end_dt = resolve_date_phrase(end_str, now)
                 if end_dt is None:
                     logger.info(f"⚠️ [Pre-processor] Failed to parse END date: '{end_str}'")
                     parse_success = False
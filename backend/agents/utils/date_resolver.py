@@ -0,0 +1,208 @@
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "1024"))
+DATE_CACHE_TTL_SECONDS = float(os.getenv("DATE_CACHE_TTL_SECONDS", "86400"))
+DATEPARSER_LANGUAGES = ['en']
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+UNIT_DELTAS = {
+    "second": lambda n: relativedelta(seconds=n),
+    "minute": lambda n: relativedelta(minutes=n),
+    "hour": lambda n: relativedelta(hours=n),
+    "day": lambda n: relativedelta(days=n),
+    "week": lambda n: relativedelta(weeks=n),
+    "month": lambda n: relativedelta(months=n),
+    "year": lambda n: relativedelta(years=n),
+}
+
+TIME_PATTERN = r"(?:\s+(?:at\s+)?(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?(?::(?P<second>\d{2}))?\s*(?P<meridiem>am|pm)?)?"
+AGO_PATTERN = re.compile(r"(?P<amount>\d+)\s+(?P<unit>second|minute|hour|day|week|month|year)s?\s+ago")
+DAY_PATTERN = re.compile(r"(?P<day>today|yesterday)" + TIME_PATTERN)
+WEEK_DAY_PATTERN = re.compile(r"(?P<week>last|this)\s+week\s+(?P<weekday>" + "|".join(WEEKDAYS) + ")" + TIME_PATTERN)
+ABSOLUTE_PATTERN = re.compile(r"(?P<date>[a-z]+\s+\d{1,2},\s*\d{4}|\d{4}-\d{2}-\d{2})" + TIME_PATTERN)
+# Phrases whose meaning moves with the clock, not just with the day; their dateparser results are never cached.
+CLOCK_RELATIVE_PATTERN = re.compile(r"\b(now|ago|hours?|minutes?|seconds?|noon|midnight)\b")
+# dateparser keeps the current time of day for these unless the phrase states a time.
+RELATIVE_DAY_PATTERN = re.compile(
+    r"\b(today|yesterday|tomorrow|last|this|next|past|previous|weeks?|months?|years?|" + "|".join(WEEKDAYS) + r")\b")
+EXPLICIT_TIME_PATTERN = re.compile(r"\d{1,2}(:\d{2}){1,2}|\d\s*(am|pm)\b")
+
+
+def normalize_phrase(phrase: str) -> str:
+    return re.sub(r"\s+", " ", phrase).strip().lower()
+
+
+def _apply_time(day: datetime.date, match: re.Match) -> Optional[datetime.datetime]:
+    hour, minute, second = match.group("hour"), match.group("minute"), match.group("second")
+    if hour is None:
+        return datetime.datetime.combine(day, datetime.time(0, 0, 0))
+    hour = int(hour)
+    meridiem = match.group("meridiem")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    try:
+        return datetime.datetime.combine(day, datetime.time(hour, int(minute or 0), int(second or 0)))
+    except ValueError:
+        return None
+
+
+def _parse_absolute_date(text: str) -> Optional[datetime.date]:
+    for date_format in ("%B %d, %Y", "%b %d, %Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(re.sub(r",\s*", ", ", text), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def fast_resolve(phrase: str, now: datetime.datetime) -> Optional[datetime.datetime]:
+    """
+    Resolves the canonical phrase forms the orchestrator prompt produces ("now", "3 months ago",
+    "yesterday at 8am", "last week monday 00:00:00", "December 1, 2025") without dateparser.
+    Returns None for anything else.
+    """
+    phrase = normalize_phrase(phrase)
+    if phrase == "now":
+        return now
+
+    match = AGO_PATTERN.fullmatch(phrase)
+    if match:
+        return now - UNIT_DELTAS[match.group("unit")](int(match.group("amount")))
+
+    match = DAY_PATTERN.fullmatch(phrase)
+    if match:
+        if match.group("day") == "today" and match.group("hour") is None:
+            return now
+        day = now.date() - datetime.timedelta(days=0 if match.group("day") == "today" else 1)
+        if match.group("hour") is None:
+            # dateparser keeps the current time of day for a bare "yesterday".
+            return datetime.datetime.combine(day, now.time())
+        return _apply_time(day, match)
+
+    match = WEEK_DAY_PATTERN.fullmatch(phrase)
+    if match:
+        monday = now.date() - datetime.timedelta(days=now.weekday() + (7 if match.group("week") == "last" else 0))
+        return _apply_time(monday + datetime.timedelta(days=WEEKDAYS.index(match.group("weekday"))), match)
+
+    match = ABSOLUTE_PATTERN.fullmatch(phrase)
+    if match:
+        day = _parse_absolute_date(match.group("date"))
+        if day is not None:
+            return _apply_time(day, match)
+    return None
+
+
+class DatePhraseCache:
+    """LRU cache with TTL of dateparser results keyed on (phrase, reference day)."""
+
+    def __init__(self, max_size: int = DATE_CACHE_SIZE, ttl_seconds: float = DATE_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Optional[datetime.datetime]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Tuple[bool, Optional[datetime.datetime]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Tuple[str, str], value: Optional[datetime.datetime]) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+date_phrase_cache = DatePhraseCache()
+
+
+def is_cacheable(phrase: str) -> bool:
+    """
+    A phrase can be cached per reference day unless its result depends on the time of day: clock-relative
+    phrases ("2 hours ago") never are, and day-relative phrases ("last friday") only with an explicit time.
+    """
+    if CLOCK_RELATIVE_PATTERN.search(phrase):
+        return False
+    return not RELATIVE_DAY_PATTERN.search(phrase) or bool(EXPLICIT_TIME_PATTERN.search(phrase))
+
+
+def _dateparser_parse(phrase: str, now: datetime.datetime) -> Optional[datetime.datetime]:
+    import dateparser
+    return dateparser.parse(phrase, languages=DATEPARSER_LANGUAGES,
+                            settings={'RELATIVE_BASE': now})
+
+
+def resolve_date_phrase(phrase: str, now: datetime.datetime = None) -> Optional[datetime.datetime]:
+    """
+    Resolves a natural-language date phrase relative to `now`: canonical forms are handled directly,
+    everything else goes through dateparser (English only), memoized on (phrase, reference day).
+    """
+    now = now or datetime.datetime.now()
+    resolved = fast_resolve(phrase, now)
+    if resolved is not None:
+        return resolved
+
+    normalized = normalize_phrase(phrase)
+    if not is_cacheable(normalized):
+        return _dateparser_parse(phrase, now)
+
+    key = (normalized, now.date().isoformat())
+    found, resolved = date_phrase_cache.get(key)
+    if not found:
+        resolved = _dateparser_parse(phrase, now)
+        date_phrase_cache.put(key, resolved)
+    return resolved
+
+
+def warm_up_date_parser() -> float:
+    """Loads dateparser and its English language data so the first request does not pay for it; returns seconds."""
+    started_at = time.perf_counter()
+    _dateparser_parse("December 1, 2025 00:00:00", datetime.datetime.now())
+    _dateparser_parse("2 weeks ago", datetime.datetime.now())
+    elapsed = time.perf_counter() - started_at
+    logger.info(f"DateResolver: dateparser warmed up in {elapsed:.2f}s.")
+    return elapsed
@@ -0,0 +1,247 @@
+import datetime
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from agents.utils.orchestrator_prompt import PLAN_SCHEMA
+
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|good (morning|afternoon|evening)|thanks|thank you|thx|how are you|who are you)"
+    r"(\s+(there|again|so much|a lot|you|doing))*[\s!?.,]*(how are you( doing)?)?[\s!?.,]*$",
+    re.IGNORECASE
+)
+TOTAL_DOWNTIME_PATTERN = re.compile(r"\b(total downtime|how much downtime|sum of (the )?downtime)\b", re.IGNORECASE)
+TOP_LINES_PATTERN = re.compile(
+    r"\b((which|what) lines? (had|has|have) (the )?(most|highest|biggest|largest) downtime"
+    r"|top (\d+ )?lines|lines? with the most downtime)\b",
+    re.IGNORECASE
+)
+LONG_EVENTS_PATTERN = re.compile(
+    r"\b(longer than|more than|over|greater than|exceeding|at least)\s+(\d+)\s*(minutes?|mins?)\b",
+    re.IGNORECASE
+)
+LIST_EVENTS_PATTERN = re.compile(r"\b(show|list|find|give me|get)\b.*\b(events?|logs?|downtimes?|incidents?)\b",
+                                 re.IGNORECASE)
+# "line MEA204-1" and bare "line 2" filter on the id after "line"; "Line2-DEMO", the CSV's own format, on the whole word.
+LINE_PATTERN = re.compile(
+    r"\bline\s+(?P<id>(?=[\w.-]*\d)\w(?:[\w.-]*\w)?)|\b(?P<name>line\d(?:[\w.-]*\w)?)",
+    re.IGNORECASE
+)
+ALL_LINES_PATTERN = re.compile(r"\b(across|on|for|in|over) (all|every|each) (the )?lines?\b", re.IGNORECASE)
+
+# Words that mean the user is searching the Notes text or referring to earlier turns; these need the LLM planner.
+SEMANTIC_CUE_PATTERN = re.compile(
+    r"\b(cause[sd]?|reasons?|why|fix(ed|es)?|solutions?|issues?|errors?|problems?|jams?|sensors?|patterns?"
+    r"|frequent|often|notes?|mention(s|ed)?|similar|those|it|same|them)\b"
+    r"|\bthat\b(?!\s+(were|was|are|is|had|have|lasted))|['\"]",
+    re.IGNORECASE
+)
+DATE_CUE_PATTERN = re.compile(
+    r"\b(january|february|march|april|may|june|july|august|september|october|november|december"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday|since|between|from|until|before|after"
+    r"|ago|quarter|shift|tonight|morning|afternoon|evening|night|hours?|\d{4})\b"
+    r"|\b\d{1,2}(:\d{2})?\s*(am|pm)\b",
+    re.IGNORECASE
+)
+# Words that can be left over once the intent, line, period and threshold spans are removed without changing the
+# plan. Any other leftover word ("conveyor", "packaging area", "excluding", a number) is a restriction the fast
+# path cannot express, so the query goes to the LLM planner.
+FILLER_WORDS = frozenset("""
+    a across all an any are as at be been can could did do does downtime event events for from get give had has have
+    how i in incident incidents is lasted list log logs me much of on our overall please show so tell that the there
+    total us was we were what which you
+""".split())
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+PERIOD_PATTERN = re.compile(
+    r"\b(today|yesterday|this week|last week|this month|last month|this quarter|this year|last year"
+    r"|(in the )?(last|past) (\d+) (days?|weeks?|months?))\b",
+    re.IGNORECASE
+)
+
+
+def _format(dt: datetime.datetime) -> str:
+    return f"{dt:%B} {dt.day}, {dt:%Y %H:%M:%S}"
+
+
+def _end_of_day(day: datetime.date) -> str:
+    return _format(datetime.datetime.combine(day, datetime.time(23, 59, 59)))
+
+
+def _start_of_day(day: datetime.date) -> str:
+    return _format(datetime.datetime.combine(day, datetime.time(0, 0, 0)))
+
+
+def resolve_period(period: str, now: datetime.datetime) -> Optional[Tuple[str, str]]:
+    """
+    Turns a recognised period phrase into natural_language_date_start/end strings with absolute dates.
+    """
+    period = period.lower()
+    today = now.date()
+
+    if period == "today":
+        return _start_of_day(today), "now"
+    if period == "yesterday":
+        yesterday = today - datetime.timedelta(days=1)
+        return _start_of_day(yesterday), _end_of_day(yesterday)
+    if period == "this week":
+        return _start_of_day(today - datetime.timedelta(days=today.weekday())), "now"
+    if period == "last week":
+        monday = today - datetime.timedelta(days=today.weekday() + 7)
+        return _start_of_day(monday), _end_of_day(monday + datetime.timedelta(days=6))
+    if period == "this month":
+        return _start_of_day(today.replace(day=1)), "now"
+    if period == "last month":
+        last_day = today.replace(day=1) - datetime.timedelta(days=1)
+        return _start_of_day(last_day.replace(day=1)), _end_of_day(last_day)
+    if period == "this quarter":
+        return "3 months ago", "now"
+    if period == "this year":
+        return _start_of_day(today.replace(month=1, day=1)), "now"
+    if period == "last year":
+        return _start_of_day(datetime.date(today.year - 1, 1, 1)), _end_of_day(datetime.date(today.year - 1, 12, 31))
+
+    match = re.fullmatch(r"(in the )?(last|past) (\d+) (days?|weeks?|months?)", period)
+    if match:
+        amount, unit = int(match.group(3)), match.group(4).rstrip("s")
+        return f"{amount} {unit}{'s' if amount != 1 else ''} ago", "now"
+    return None
+
+
+def build_filters(conditions: list, date_range: Optional[Tuple[str, str]]) -> Dict[str, Any]:
+    """Arranges filter conditions following the Filter Rules in the orchestrator prompt."""
+    if date_range:
+        filters: Dict[str, Any] = {}
+        if conditions:
+            filters["$and"] = conditions
+        filters["natural_language_date_start"], filters["natural_language_date_end"] = date_range
+        return filters
+    if len(conditions) == 1:
+        return dict(conditions[0])
+    if conditions:
+        return {"$and": conditions}
+    return {}
+
+
+def validate_plan(plan: Dict[str, Any]) -> bool:
+    if not isinstance(plan, dict):
+        return False
+    if any(key not in plan for key in PLAN_SCHEMA["required"]):
+        return False
+    allowed_agents = PLAN_SCHEMA["properties"]["steps"]["items"]["properties"]["agent"]["enum"]
+    steps = plan.get("steps")
+    if not isinstance(steps, list) or not steps:
+        return False
+    return all(isinstance(step, dict) and step.get("agent") in allowed_agents for step in steps)
+
+
+class FastPathPlanner:
+    """
+    Deterministic pre-planner for the common query shapes in orchestrator_prompt.EXAMPLES.
+    Returns None whenever it is not confident, so the caller falls back to the LLM orchestrator.
+    """
+
+    def __init__(self, min_confidence: float = FAST_PATH_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+
+    def plan(self, user_query: str, now: datetime.datetime = None) -> Optional[Dict[str, Any]]:
+        plan, confidence = self.match(user_query, now or datetime.datetime.now())
+        if plan is None or confidence < self.min_confidence or not validate_plan(plan):
+            return None
+        return plan
+
+    def match(self, user_query: str, now: datetime.datetime) -> Tuple[Optional[Dict[str, Any]], float]:
+        query = user_query.strip()
+
+        if GREETING_PATTERN.match(query):
+            return {"user_query": user_query, "steps": [{"agent": "synthesis"}]}, 1.0
+
+        analysis_type = None
+        conditions = []
+        analysis_match = TOTAL_DOWNTIME_PATTERN.search(query)
+        if analysis_match:
+            analysis_type = "calculate_total_downtime"
+        else:
+            analysis_match = TOP_LINES_PATTERN.search(query)
+            if analysis_match:
+                analysis_type = "aggregate_by_line"
+
+        long_events = LONG_EVENTS_PATTERN.search(query)
+        if long_events:
+            operator = "$gte" if long_events.group(1).lower() == "at least" else "$gt"
+            conditions.append({"Downtime Minutes": {operator: int(long_events.group(2))}})
+            if analysis_type is None and LIST_EVENTS_PATTERN.search(query):
+                analysis_type = "passthrough"
+
+        if analysis_type is None:
+            return None, 0.0
+
+        remaining = ALL_LINES_PATTERN.sub(" ", query)
+        if analysis_match:
+            remaining = remaining.replace(analysis_match.group(0), " ")
+        line_match = LINE_PATTERN.search(remaining)
+        if line_match and analysis_type != "aggregate_by_line":
+            conditions.insert(0, {"Line": line_match.group("id") or line_match.group("name")})
+            remaining = remaining.replace(line_match.group(0), " ")
+
+        date_range = None
+        periods = PERIOD_PATTERN.findall(remaining)
+        if len(periods) > 1:
+            return None, 0.0
+        if periods:
+            period_match = PERIOD_PATTERN.search(remaining)
+            date_range = resolve_period(period_match.group(0), now)
+            remaining = remaining.replace(period_match.group(0), " ")
+            if date_range is None:
+                return None, 0.0
+
+        confidence = 1.0
+        if long_events:
+            remaining = remaining.replace(long_events.group(0), " ")
+        if SEMANTIC_CUE_PATTERN.search(remaining):
+            confidence -= 0.5
+        if DATE_CUE_PATTERN.search(remaining):
+            confidence -= 0.5
+        if any(word not in FILLER_WORDS for word in WORD_PATTERN.findall(remaining.lower())):
+            confidence -= 0.5
+
+        task = {"type": "metadata_query", "filters": build_filters(conditions, date_range)}
+        plan = {
+            "user_query": user_query,
+            "steps": [
+                {"agent": "retrieval", "task": task},
+                {"agent": "analysis", "task": {"type": analysis_type}},
+                {"agent": "synthesis"}
+            ]
+        }
+        return plan, confidence
+
+
+class PlanSourceStats:
+    """Counts how many plans came from each planner path and how long they took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._total_seconds: Dict[str, float] = {}
+
+    def record(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self._counts[source] = self._counts.get(source, 0) + 1
+            self._total_seconds[source] = self._total_seconds.get(source, 0.0) + seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                source: {
+                    "count": count,
+                    "avg_latency_ms": round(self._total_seconds[source] / count * 1000, 3),
+                }
+                for source, count in self._counts.items()
+            }
+
+
+planner_stats = PlanSourceStats()
@@ -0,0 +1,119 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from repositories.sql_databases import plan_cache_repo
+
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "512"))
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "3600"))
+PLAN_CACHE_HISTORY_MESSAGES = int(os.getenv("PLAN_CACHE_HISTORY_MESSAGES", "4"))
+PLAN_CACHE_PERSIST = os.getenv("PLAN_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+
+
+def build_plan_cache_key(model_id: str, user_query: str, conversation_history: list = None,
+                         now: datetime.datetime = None) -> str:
+    """
+    Builds the cache key from the normalized query, a fingerprint of the most recent history and the current day.
+    The day is part of the key because the orchestrator resolves phrases like "this month" into absolute dates.
+    """
+    normalized_query = re.sub(r'\s+', ' ', user_query).strip().lower()
+
+    history = list(conversation_history or [])
+    # The current query is already stored in the conversation before planning, so drop it from the fingerprint.
+    if history and history[-1].get("role") == "user" and history[-1].get("content") == user_query:
+        history = history[:-1]
+    relevant_history = history[-PLAN_CACHE_HISTORY_MESSAGES:] if PLAN_CACHE_HISTORY_MESSAGES > 0 else []
+    history_fingerprint = hashlib.sha256(
+        json.dumps([[m.get("role"), m.get("content")] for m in relevant_history]).encode("utf-8")
+    ).hexdigest()
+
+    day = (now or datetime.datetime.now()).date().isoformat()
+    raw_key = json.dumps([model_id, normalized_query, history_fingerprint, day])
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """
+    In-memory LRU cache with TTL for orchestrator plans, optionally backed by the SQLite plan_cache table.
+    Plans are stored as JSON so every hit returns a fresh copy that callers are free to mutate.
+    """
+
+    def __init__(self, max_size: int = PLAN_CACHE_SIZE, ttl_seconds: float = PLAN_CACHE_TTL_SECONDS,
+                 persist: bool = PLAN_CACHE_PERSIST):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                expires_at, plan_json = entry
+                if expires_at > now:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return json.loads(plan_json)
+                del self._entries[cache_key]
+
+        if self.persist:
+            plan_json = plan_cache_repo.get_plan(cache_key)
+            if plan_json is not None:
+                with self._lock:
+                    self._put(cache_key, plan_json, now + self.ttl_seconds)
+                    self.hits += 1
+                return json.loads(plan_json)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, cache_key: str, plan: Dict[str, Any]) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        plan_json = json.dumps(plan)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put(cache_key, plan_json, expires_at)
+        if self.persist:
+            plan_cache_repo.save_plan(cache_key, plan_json, expires_at)
+
+    def _put(self, cache_key: str, plan_json: str, expires_at: float) -> None:
+        self._entries[cache_key] = (expires_at, plan_json)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.persist:
+            plan_cache_repo.clear_plans()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "persist": self.persist,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+plan_cache = PlanCache()
@@ -2,7 +2,8 @@ import logging
 import uuid
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from agents.main_agent import MainAgent
+from starlette.concurrency import run_in_threadpool
+from agents.agent_registry import agent_registry
 from agents.llm_models.model_registry import DEFAULT_MODEL_ID, ALLOWED_MODEL_IDS
 from agents.utils.schemas import RequestContext
 
@@ -25,11 +26,11 @@ async def agent_query(query: str, session_id: str, conversation_id: str = None,
             },
         )
 
-    main_agent = MainAgent(model_id=resolved_model_id)
-
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id is required")
 
+    main_agent = await run_in_threadpool(agent_registry.get_agent, resolved_model_id)
+
     context = RequestContext(
         session_id = session_id,
         conversation_id = conversation_id or str(uuid.uuid4())
@@ -1,4 +1,10 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from api.warmup import warmup_state
+from repositories.vector_chroma_db.embedding_cache import query_embedding_cache
+from agents.utils.plan_cache import plan_cache
+from agents.utils.fast_path_planner import planner_stats
+from agents.utils.date_resolver import date_phrase_cache
 
 router = APIRouter()
 
@@ -7,3 +13,21 @@ router = APIRouter()
 @router.get('/health')
 def health_check():
     return 'ok'
+
+
+@router.head('/ready')
+@router.get('/ready')
+def readiness_check():
+    snapshot = warmup_state.snapshot()
+    return JSONResponse(status_code=200 if warmup_state.ready else 503, content=snapshot)
+
+
+@router.get('/metrics')
+def metrics():
+    return {
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "plan_cache": plan_cache.stats(),
+        "planner": planner_stats.stats(),
+        "date_phrase_cache": date_phrase_cache.stats(),
+        "warmup": warmup_state.snapshot(),
+    }
@@ -1,11 +1,24 @@
 import logging
+import threading
 from fastapi import APIRouter, HTTPException, Response, status
 from repositories.sql_databases import known_issues_repo
-from repositories.vector_chroma_db.chroma_client import ChromaClient
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-chroma_client = ChromaClient("known_issues")
+_chroma_client = None
+_chroma_client_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """Opens the known_issues collection on first use, so read-only endpoints never load Chroma or the embedding model."""
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_client_lock:
+            if _chroma_client is None:
+                from repositories.vector_chroma_db.chroma_client import ChromaClient
+                _chroma_client = ChromaClient("known_issues")
+    return _chroma_client
+
 
 @router.post("/known_issues/")
 async def create_issue(title, description, solution, author):
@@ -19,7 +32,7 @@ async def create_issue(title, description, solution, author):
     logger.info(f"creating known issue in vector database")
     documents_content = f"Title:{title}. Description:{description}. Solution:{solution}."
     metadata = {"title": title, "description": description, "solution": solution, "author": author}
-    chroma_client.add_single_item(ids=issue_id, document=documents_content, metadata=metadata)
+    get_chroma_client().add_single_item(ids=issue_id, document=documents_content, metadata=metadata)
 
     created_issue = known_issues_repo.get_issue_by_id(issue_id)
     return created_issue
@@ -51,7 +64,7 @@ async def update_issue(issue_id, title, description, solution, author):
     logger.info(f"updating known issue in vector database with id: {issue_id}")
     documents_content = f"Title:{title}. Description:{description}. Solution:{solution}."
     metadata = {"title": title, "description": description, "solution": solution, "author": author}
-    chroma_client.upsert_single_item(id=issue_id, document=documents_content, metadata=metadata)
+    get_chroma_client().upsert_single_item(id=issue_id, document=documents_content, metadata=metadata)
 
     updated_issue = known_issues_repo.get_issue_by_id(update_issue_id)
     return updated_issue
@@ -66,6 +79,6 @@ async def delete_issue(issue_id):
             detail="Failed to delete known issue in the database"
         )
     logger.info(f"deleting known issue from vector database with id: {issue_id}")
-    chroma_client.delete_item(id=issue_id)
+    get_chroma_client().delete_item(id=issue_id)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
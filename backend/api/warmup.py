@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agents.llm_models.model_registry import DEFAULT_MODEL_ID
+
+# Disable for CRUD-only workers and test runs: models then load on the first agent query instead.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# Attempts per required component before the warm-up gives up, with exponential backoff between them.
+WARMUP_REQUIRED_ATTEMPTS = int(os.getenv("WARMUP_REQUIRED_ATTEMPTS", "5"))
+WARMUP_RETRY_BACKOFF_SECONDS = float(os.getenv("WARMUP_RETRY_BACKOFF_SECONDS", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """
+    Progress of the startup warm-up, read by the /ready endpoint. Only required components gate readiness;
+    an optional component that fails (e.g. an offline model download) leaves the status 'degraded', which is
+    still ready, and the component loads on first use instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "pending"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.required_errors: Dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "degraded", "skipped")
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+            self.timings.clear()
+            self.errors.clear()
+            self.required_errors.clear()
+
+    def record(self, component: str, seconds: float, error: Optional[str] = None, required: bool = False) -> None:
+        with self._lock:
+            self.timings[component] = round(seconds, 3)
+            if error:
+                self.errors[component] = error
+                if required:
+                    self.required_errors[component] = error
+            else:
+                self.errors.pop(component, None)
+                self.required_errors.pop(component, None)
+
+    def skip(self) -> None:
+        with self._lock:
+            self.status = "skipped"
+
+    def finish(self) -> None:
+        with self._lock:
+            self.finished_at = time.time()
+            if self.required_errors:
+                self.status = "failed"
+            else:
+                self.status = "degraded" if self.errors else "ready"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "total_seconds": round(self.finished_at - self.started_at, 3)
+                if self.started_at and self.finished_at else None,
+                "timings": dict(self.timings),
+                "errors": dict(self.errors),
+                "required_errors": dict(self.required_errors),
+            }
+
+
+warmup_state = WarmupState()
+
+
+def _import_libraries():
+    import torch  # noqa: F401
+    import sentence_transformers  # noqa: F401
+    import sklearn.cluster  # noqa: F401
+    import sklearn.decomposition  # noqa: F401
+    import chromadb  # noqa: F401
+
+
+def _load_embedding_model():
+    from repositories.vector_chroma_db.embedding_service import get_embedding_service
+    get_embedding_service().encode(["conveyor jam cleared and restarted"])
+
+
+def _build_default_agent():
+    from agents.agent_registry import agent_registry
+    agent_registry.get_agent(DEFAULT_MODEL_ID)
+
+
+def _query_chroma():
+    from agents.agent_registry import agent_registry
+    agent_retrieval = agent_registry.get_agent(DEFAULT_MODEL_ID).agent_retrieval
+    agent_retrieval.downtime_logs_client.query_items(query_texts=["sensor fault"], n_results=1)
+
+
+def _warm_sklearn():
+    import numpy as np
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+    sample = np.random.default_rng(0).normal(size=(16, 8)).astype(np.float32)
+    KMeans(n_clusters=2, random_state=42, n_init=1).fit(PCA(n_components=2).fit_transform(sample))
+
+
+def _warm_date_parser():
+    from agents.utils.date_resolver import warm_up_date_parser
+    warm_up_date_parser()
+
+
+def _load_tokenizer():
+    from agents.utils.conversation_context import get_token_counter
+    get_token_counter(DEFAULT_MODEL_ID)("warm up")
+
+
+# (component, step, required). Requests cannot be served without the required components. The optional ones only
+# move a first-request cost to startup: the agent registry builds the agent (and loads the models) again on the
+# first agent query when their warm-up failed, e.g. on an offline model download or an empty Chroma collection.
+WARMUP_STEPS: List[Tuple[str, Callable[[], None], bool]] = [
+    ("imports", _import_libraries, True),
+    ("embedding_model", _load_embedding_model, False),
+    ("default_agent", _build_default_agent, False),
+    ("chroma_query", _query_chroma, False),
+    ("sklearn", _warm_sklearn, False),
+    ("dateparser", _warm_date_parser, False),
+    ("tokenizer", _load_tokenizer, False),
+]
+
+
+def run_warmup(state: WarmupState = warmup_state,
+               steps: List[Tuple[str, Callable[[], None], bool]] = None) -> dict:
+    """
+    Preloads the heavy libraries and models and runs one embedding, one Chroma query and one date parse,
+    recording how long each component took. A failing component is recorded and the others still run;
+    required components are retried with exponential backoff up to WARMUP_REQUIRED_ATTEMPTS times.
+    """
+    state.start()
+    logger.info("Warm-up: starting...")
+    for component, step, required in steps or WARMUP_STEPS:
+        attempts = max(1, WARMUP_REQUIRED_ATTEMPTS) if required else 1
+        for attempt in range(1, attempts + 1):
+            started_at = time.perf_counter()
+            try:
+                step()
+                state.record(component, time.perf_counter() - started_at)
+                logger.info(f"Warm-up: {component} ready in {time.perf_counter() - started_at:.2f}s")
+                break
+            except Exception as e:
+                state.record(component, time.perf_counter() - started_at, error=str(e), required=required)
+                logger.error(f"Warm-up: {component} failed (attempt {attempt}/{attempts}): {e}", exc_info=True)
+                if attempt < attempts:
+                    time.sleep(WARMUP_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    state.finish()
+    snapshot = state.snapshot()
+    logger.info(f"Warm-up: finished with status '{snapshot['status']}' in {snapshot['total_seconds']}s")
+    return snapshot
+
+
+def start_warmup_thread(state: WarmupState = warmup_state) -> Optional[threading.Thread]:
+    """
+    Runs the warm-up in a daemon thread so the server accepts /health checks while it loads.
+    With WARMUP_ENABLED off nothing is loaded and /ready reports 'skipped' straight away.
+    """
+    if not WARMUP_ENABLED:
+        state.skip()
+        logger.info("Warm-up: skipped (WARMUP_ENABLED is off).")
+        return None
+    thread = threading.Thread(target=run_warmup, args=(state,), name="warmup", daemon=True)
+    thread.start()
+    return thread
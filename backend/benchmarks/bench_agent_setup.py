@@ -0,0 +1,39 @@
+import statistics
+import time
+
+from agents.main_agent import MainAgent
+from agents.agent_registry import AgentRegistry
+from agents.llm_models.model_registry import DEFAULT_MODEL_ID
+
+
+def time_calls(fn, iterations: int) -> list:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    print(f"{label:<32} mean={statistics.mean(timings) * 1000:10.3f} ms  "
+          f"max={max(timings) * 1000:10.3f} ms  n={len(timings)}")
+
+
+def run_benchmark(iterations: int = 10):
+    """
+    Compares per-request setup cost of building a fresh MainAgent (the old /agent/query behaviour)
+    against fetching the shared agent from the AgentRegistry.
+    Run from the backend folder: python -m benchmarks.bench_agent_setup
+    """
+    print(f"Benchmarking agent setup for model {DEFAULT_MODEL_ID} ({iterations} iterations)...")
+
+    report("MainAgent() per request", time_calls(lambda: MainAgent(model_id=DEFAULT_MODEL_ID), iterations))
+
+    registry = AgentRegistry()
+    report("AgentRegistry first build", time_calls(lambda: registry.get_agent(DEFAULT_MODEL_ID), 1))
+    report("AgentRegistry.get_agent()", time_calls(lambda: registry.get_agent(DEFAULT_MODEL_ID), iterations))
+
+
+if __name__ == "__main__":
+    run_benchmark()
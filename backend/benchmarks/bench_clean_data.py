@@ -0,0 +1,68 @@
+import argparse
+import os
+import random
+import time
+
+import pandas as pd
+
+from repositories.vector_chroma_db.clean_data import clean_chunks, clean_data
+
+NOTE_TEMPLATES = [
+    "<p><b>Issue:</b> Jammed Belt<br><b>Root Cause:</b> Debris&nbsp;<br><b>Fix:</b> Cleared</p>",
+    "Problem: sensor misalignment on station {n}   Fix/Change: tightened bracket (Updated via TechCenter)",
+    "Notes:   Conveyor belt jam in section {n}. Cleared debris and restarted. (created via web)",
+    "problem: fix/change:",
+    "Reseated fixture &#39;A{n}&#39;\n\tand re-ran   calibration",
+    "",
+    None,
+]
+
+
+def make_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = random.Random(seed)
+    notes = []
+    for _ in range(rows):
+        template = rng.choice(NOTE_TEMPLATES)
+        notes.append(template.format(n=rng.randint(1, 5000)) if template else template)
+    return pd.DataFrame({
+        'Timestamp': [f"12/{rng.randint(1, 28):02d}/2025 {rng.randint(0, 23):02d}:00" for _ in range(rows)],
+        'Downtime Minutes': [rng.choice(["45.5", "25", "", "n/a", "10"]) for _ in range(rows)],
+        'Notes': notes,
+        'Line': [f"Line{rng.randint(1, 8)}" for _ in range(rows)],
+    })
+
+
+def timed(label: str, rows: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms  {rows / elapsed:12,.0f} rows/sec")
+    return result
+
+
+def run_benchmark(rows: int = 200_000, chunk_size: int = 20_000, workers: int = os.cpu_count() or 1):
+    """
+    Compares the throughput of the row-wise clean_data (three Series.apply passes) with the vectorized path and
+    with multiprocess chunk cleaning. That all of them produce identical frames is tested in tests/test_clean_data.py.
+    Run from the backend folder: python -m benchmarks.bench_clean_data
+    """
+    frame = make_frame(rows)
+    print(f"Benchmarking clean_data on {rows:,} rows ({workers} workers, chunks of {chunk_size:,})...")
+
+    timed("row-wise apply", rows, lambda: clean_data(frame.copy(), vectorized=False))
+    timed("vectorized", rows, lambda: clean_data(frame.copy()))
+
+    def clean_in_chunks(worker_count):
+        chunks = (frame.iloc[start:start + chunk_size].copy() for start in range(0, rows, chunk_size))
+        return pd.concat(list(clean_chunks(chunks, worker_count)))
+
+    timed(f"vectorized, {workers} processes", rows, lambda: clean_in_chunks(workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark clean_data implementations.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.chunk_size, args.workers)
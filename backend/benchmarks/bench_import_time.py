@@ -0,0 +1,56 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "sklearn", "chromadb", "pandas", "numpy",
+                 "dateparser"]
+IMPORT_LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime and returns (module, self_us, cumulative_us) for
+    every module loaded, with nesting depth dropped. Warm-up is disabled so only import time is measured.
+    """
+    env = dict(os.environ, WARMUP_ENABLED="false")
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        tail = "\n".join(line for line in completed.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"import {module} failed:\n{tail[-2000:]}")
+
+    timings = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE_PATTERN.match(line)
+        if match:
+            timings.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return timings
+
+
+def run_benchmark(modules: List[str], top: int = 15):
+    """
+    Reports the startup import cost of the API entry points and which heavy libraries they pull in.
+    Run from the backend folder: python -m benchmarks.bench_import_time
+    """
+    for module in modules:
+        timings = measure_imports(module)
+        total_us = next(cumulative for name, _, cumulative in timings if name == module)
+        loaded = {name for name, _, _ in timings}
+        heavy_loaded = [name for name in HEAVY_MODULES if name in loaded]
+
+        print(f"import {module}: {total_us / 1e6:.3f}s, {len(timings)} modules")
+        print(f"  heavy libraries loaded: {', '.join(heavy_loaded) if heavy_loaded else 'none'}")
+        print(f"  top {top} by cumulative time:")
+        for name, _, cumulative in sorted(timings, key=lambda item: item[2], reverse=True)[:top]:
+            print(f"    {cumulative / 1000:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time of the API modules with -X importtime.")
+    parser.add_argument("modules", nargs="*", default=["main", "api.router"])
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    run_benchmark(args.modules, args.top)
@@ -0,0 +1,99 @@
+import argparse
+import re
+import statistics
+import time
+from typing import List, Optional, Set, Tuple
+
+from agents.agent_retrieval import AgentRetrieval
+from repositories.sql_databases import downtime_logs_repo
+from repositories.vector_chroma_db.bm25_index import tokenize
+
+QUERY_PATTERN = re.compile(r'^\*\s+"(?P<query>.+)"\s*$')
+QUOTED_PHRASE_PATTERN = re.compile(r"'(?P<phrase>[^']+)'")
+
+
+def load_queries(path: str) -> List[Tuple[str, Optional[str]]]:
+    """(query, quoted phrase or None) for every bullet in the query examples file."""
+    queries = []
+    with open(path, encoding="utf-8") as examples:
+        for line in examples:
+            match = QUERY_PATTERN.match(line.strip())
+            if match:
+                phrase = QUOTED_PHRASE_PATTERN.search(match.group("query"))
+                queries.append((match.group("query"), phrase.group("phrase") if phrase else None))
+    return queries
+
+
+def relevant_ids(phrase: str) -> Set[str]:
+    """Ground truth for a quoted phrase: every log whose cleaned notes contain all of its tokens."""
+    terms = set(tokenize(phrase))
+    logs = downtime_logs_repo.get_logs(include=["documents"])
+    return {log_id for log_id, note in zip(logs["ids"], logs["documents"]) if terms <= set(tokenize(note or ""))}
+
+
+def run_config(agent_retrieval: AgentRetrieval, queries, relevant: dict, threshold: Optional[float], n_results: int,
+               hybrid: bool) -> dict:
+    agent_retrieval.similarity_threshold = threshold
+    recalls, precisions, returned, latencies = [], [], [], []
+    for query, phrase in queries:
+        search_text = phrase or query
+        started_at = time.perf_counter()
+        if hybrid:
+            result = agent_retrieval.retrieve_data({'type': 'semantic_query', 'query_text': search_text},
+                                                   n_results=n_results)
+        else:
+            result = agent_retrieval.downtime_logs_client.query_items(
+                query_texts=[search_text], n_results=n_results, min_similarity=threshold)
+        latencies.append(time.perf_counter() - started_at)
+        ids = set(result.frame['ids']) if not result.empty else set()
+        returned.append(len(ids))
+
+        if relevant.get(query):
+            found = len(ids & relevant[query])
+            recalls.append(found / min(len(relevant[query]), n_results))
+            precisions.append(found / len(ids) if ids else 0.0)
+
+    return {
+        "recall": statistics.mean(recalls) if recalls else None,
+        "precision": statistics.mean(precisions) if precisions else None,
+        "rows": statistics.mean(returned),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def run_evaluation(path: str, thresholds: List[Optional[float]], pool_sizes: List[int]):
+    """
+    Offline recall/latency sweep of similarity retrieval over the example queries, against the seeded ChromaDB,
+    analytics store and BM25 index. Queries with a quoted phrase ('pogo pin') are scored against every log whose
+    notes contain that phrase's tokens; the others only contribute returned rows and latency, the numbers that
+    drive prompt size. Run from the backend folder: python -m benchmarks.eval_retrieval
+    """
+    queries = load_queries(path)
+    relevant = {query: relevant_ids(phrase) for query, phrase in queries if phrase}
+    print(f"{len(queries)} queries, {len(relevant)} with a quoted phrase as ground truth "
+          f"({', '.join(str(len(ids)) for ids in relevant.values())} relevant logs).")
+
+    agent_retrieval = AgentRetrieval()
+    # One untimed pass so the embedding model and index loading are not counted.
+    run_config(agent_retrieval, queries, relevant, None, min(pool_sizes), hybrid=True)
+
+    print(f"{'mode':<7} {'threshold':>9} {'n':>5} {'recall':>7} {'precision':>9} {'rows':>7} {'p50 ms':>8} {'max ms':>8}")
+    for hybrid in (False, True):
+        for threshold in thresholds:
+            for n_results in pool_sizes:
+                metrics = run_config(agent_retrieval, queries, relevant, threshold, n_results, hybrid)
+                recall = f"{metrics['recall']:.3f}" if metrics['recall'] is not None else "-"
+                precision = f"{metrics['precision']:.3f}" if metrics['precision'] is not None else "-"
+                print(f"{'hybrid' if hybrid else 'vector':<7} {str(threshold):>9} {n_results:>5} {recall:>7} "
+                      f"{precision:>9} {metrics['rows']:>7.1f} {metrics['p50_ms']:>8.1f} {metrics['max_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate recall and latency of semantic retrieval settings.")
+    parser.add_argument("--queries", default="query_examples")
+    parser.add_argument("--thresholds", type=lambda value: [None if v == "none" else float(v) for v in value.split(",")],
+                        default=[None, 0.2, 0.3, 0.4, 0.5])
+    parser.add_argument("--pool-sizes", type=lambda value: [int(v) for v in value.split(",")], default=[5, 10, 50, 200])
+    args = parser.parse_args()
+    run_evaluation(args.queries, args.thresholds, args.pool_sizes)
@@ -1,23 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from repositories.sql_databases.databases import initialize_database
+from repositories.sql_databases.databases import initialize_database, close_all_connections
+from repositories.sql_databases.downtime_logs_repo import initialize_downtime_logs_store
+from agents.agent_registry import agent_registry
 import uvicorn
 import logging
 
 from fastapi.middleware.cors import CORSMiddleware
 from api.router import api_router
+from api.warmup import start_warmup_thread
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="Agent Query API", description="API to handle user queries for an agent", version="1.0.0")
-
 
-@app.on_event("startup")
-def on_startup():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     logger.info("Application is starting up...")
     initialize_database()
+    initialize_downtime_logs_store()
+    # Loads models and builds the default agent in the background; /ready reports 503 until the required parts are up.
+    # Other ALLOWED_MODEL_IDS are built lazily on their first request.
+    start_warmup_thread()
+    yield
+    logger.info("Application is shutting down...")
+    await agent_registry.aclose()
+    agent_registry.clear()
+    close_all_connections()
+
+
+# Initialize FastAPI app
+app = FastAPI(title="Agent Query API", description="API to handle user queries for an agent", version="1.0.0",
+              lifespan=lifespan)
 
 
 origins = ["http://localhost:5173"]
@@ -0,0 +1,115 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from repositories.sql_databases.databases import get_db_connection, ANALYTICS_DATABASE_URL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def has_clusters() -> bool:
+    try:
+        with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+            row = conn.execute("SELECT 1 FROM cause_clusters LIMIT 1").fetchone()
+        return row is not None
+    except Exception as e:
+        logger.warning(f"Cause clusters are unavailable: {e}")
+        return False
+
+
+def load_centroids() -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Returns (centroids, member_counts) ordered by cluster id, or None when no clusters are stored."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute("SELECT centroid, member_count FROM cause_clusters ORDER BY cluster_id").fetchall()
+    if not rows:
+        return None
+    centroids = np.vstack([np.frombuffer(row['centroid'], dtype=np.float32) for row in rows])
+    counts = np.array([row['member_count'] for row in rows], dtype=np.int64)
+    return centroids, counts
+
+
+def save_centroids(centroids: np.ndarray, counts: np.ndarray):
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.executemany(
+            """
+            INSERT INTO cause_clusters (cluster_id, centroid, member_count) VALUES (?, ?, ?)
+            ON CONFLICT (cluster_id) DO UPDATE SET
+                centroid = excluded.centroid,
+                member_count = excluded.member_count,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            [
+                (cluster_id, np.asarray(centroid, dtype=np.float32).tobytes(), int(count))
+                for cluster_id, (centroid, count) in enumerate(zip(centroids, counts))
+            ]
+        )
+
+
+def get_labels() -> Dict[int, Optional[str]]:
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute("SELECT cluster_id, label FROM cause_clusters").fetchall()
+    return {row['cluster_id']: row['label'] for row in rows}
+
+
+def get_unclustered_ids() -> List[str]:
+    """Ids of logs with notes that have no cause cluster yet, in a stable order."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute(
+            """
+            SELECT id FROM downtime_logs
+            WHERE cluster_id IS NULL AND notes IS NOT NULL AND notes != ''
+            ORDER BY timestamp_unix, id
+            """
+        ).fetchall()
+    return [row['id'] for row in rows]
+
+
+def assign_clusters(assignments: Iterable[Tuple[int, str]]):
+    """Stores (cluster_id, log_id) assignments."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.executemany("UPDATE downtime_logs SET cluster_id = ? WHERE id = ?",
+                         [(int(cluster_id), log_id) for cluster_id, log_id in assignments])
+
+
+def refresh_labels():
+    """Labels every cluster with its most frequent note."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.execute(
+            """
+            UPDATE cause_clusters SET label = (
+                SELECT notes FROM downtime_logs d
+                WHERE d.cluster_id = cause_clusters.cluster_id
+                GROUP BY notes
+                ORDER BY COUNT(*) DESC, notes
+                LIMIT 1
+            )
+            """
+        )
+
+
+def clear_clusters():
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.execute("UPDATE downtime_logs SET cluster_id = NULL WHERE cluster_id IS NOT NULL")
+        conn.execute("DELETE FROM cause_clusters")
+
+
+def get_assignments(ids: List[str], chunk_size: int = 900) -> pd.DataFrame:
+    """Returns the stored cluster id and label of the given logs as a frame with columns ids, cluster_id, cluster_label."""
+    frames = []
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        # Chunked to stay below SQLite's bound-parameter limit.
+        for start in range(0, len(ids), chunk_size):
+            chunk = list(ids[start:start + chunk_size])
+            placeholders = ", ".join("?" for _ in chunk)
+            query = f"""
+                SELECT d.id AS ids, d.cluster_id, c.label AS cluster_label
+                FROM downtime_logs d LEFT JOIN cause_clusters c ON c.cluster_id = d.cluster_id
+                WHERE d.id IN ({placeholders})
+            """
+            frames.append(pd.read_sql_query(query, conn, params=chunk))
+    if not frames:
+        return pd.DataFrame(columns=['ids', 'cluster_id', 'cluster_label'])
+    return pd.concat(frames, ignore_index=True)
@@ -9,28 +9,26 @@ logger = logging.getLogger(__name__)
 def add_message(conversation_id: str, session_id: str, role: str, content: str):
     logger.info(f"Adding message for conversation {conversation_id}. Role: {role}")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,))
-        conversation_exists = cursor.fetchone() is not None
+            cursor.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,))
+            conversation_exists = cursor.fetchone() is not None
+
+            if not conversation_exists and role == 'user':
+                title = content if len(content) <= 100 else content[:97] + "..."
+                cursor.execute(
+                    "INSERT INTO conversations (id, session_id, title) VALUES (?, ?, ?)",
+                    (conversation_id, session_id, title)
+                )
+                logger.info(f"Created new conversation entry for {conversation_id} with title '{title}'.")
 
-        if not conversation_exists and role == 'user':
-            title = content if len(content) <= 100 else content[:97] + "..."
             cursor.execute(
-                "INSERT INTO conversations (id, session_id, title) VALUES (?, ?, ?)",
-                (conversation_id, session_id, title)
+                "INSERT INTO messages (conversation_id, session_id, role, content) VALUES (?, ?, ?, ?)",
+                (conversation_id, session_id, role, content)
             )
-            logger.info(f"Created new conversation entry for {conversation_id} with title '{title}'.")
-
-        cursor.execute(
-            "INSERT INTO messages (conversation_id, session_id, role, content) VALUES (?, ?, ?, ?)",
-            (conversation_id, session_id, role, content)
-        )
 
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully added message for conversation {conversation_id}.")
+            logger.info(f"Successfully added message for conversation {conversation_id}.")
     except Exception as e:
         logger.error(f"Failed to add message for conversation {conversation_id}: {e}")
         raise
@@ -40,16 +38,14 @@ def create_conversation(session_id: str, title: str) -> dict:
     conversation_id = str(uuid.uuid4())
     logger.info(f"Creating new conversation for session {session_id} with conversation ID '{conversation_id}' and title '{title}'.")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO conversations (id, session_id, title) VALUES (?, ?, ?)",
-            (conversation_id, session_id, title)
-        )
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully created new conversation {conversation_id}.")
-        return {"conversation_id": conversation_id, "title": title}
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO conversations (id, session_id, title) VALUES (?, ?, ?)",
+                (conversation_id, session_id, title)
+            )
+            logger.info(f"Successfully created new conversation {conversation_id}.")
+            return {"conversation_id": conversation_id, "title": title}
     except Exception as e:
         logger.error(f"Failed to create new conversation for session {session_id}: {e}")
         raise
@@ -58,34 +54,14 @@ def create_conversation(session_id: str, title: str) -> dict:
 def get_messages_by_conversation_id(conversation_id: str, session_id: str) -> list[dict]:
     logger.info(f"Retrieving messages for conversation {conversation_id} and session {session_id}")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-
-        cursor.execute(
-            "SELECT 1 FROM messages WHERE conversation_id = ? AND session_id = ? LIMIT 1",
-            (conversation_id, session_id)
-        )
-        
-
-        cursor.execute("SELECT 1 FROM messages WHERE conversation_id = ? LIMIT 1", (conversation_id,))
-        conversation_exists = cursor.fetchone() is not None
-
-        if not conversation_exists:
-            logger.info(f"No history found for new conversation_id: {conversation_id}")
-            return []
-
-        cursor.execute(
-            "SELECT role, content FROM messages WHERE conversation_id = ? AND session_id = ? ORDER BY timestamp ASC",
-            (conversation_id, session_id)
-        )
-        
-        messages = cursor.fetchall()
-        conn.close()
-        
-        if not messages and conversation_exists:
-            logger.warning(f"Access denied for session {session_id} to conversation {conversation_id}.")
-            return []
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ? AND session_id = ? "
+                "ORDER BY timestamp ASC, id ASC",
+                (conversation_id, session_id)
+            )
+            messages = cursor.fetchall()
 
         logger.info(f"Successfully retrieved {len(messages)} messages for conversation {conversation_id}.")
         return [dict(row) for row in messages]
@@ -95,22 +71,84 @@ def get_messages_by_conversation_id(conversation_id: str, session_id: str) -> li
         raise
 
 
+def get_unsummarized_messages(conversation_id: str, session_id: str, after_message_id: int = 0) -> list[dict]:
+    """
+    Returns every message newer than `after_message_id` (the last one folded into the rolling summary) in
+    chronological order, so no turn leaves the prompt before the summary covers it.
+    """
+    logger.info(f"Retrieving messages after {after_message_id} for conversation {conversation_id} and session {session_id}")
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, role, content FROM messages
+                WHERE conversation_id = ? AND session_id = ? AND id > ?
+                ORDER BY timestamp ASC, id ASC
+                """,
+                (conversation_id, session_id, after_message_id or 0)
+            )
+            messages = cursor.fetchall()
+
+        logger.info(f"Successfully retrieved {len(messages)} unsummarized messages for conversation {conversation_id}.")
+        return [dict(row) for row in messages]
+
+    except Exception as e:
+        logger.error(f"Failed to retrieve unsummarized messages for conversation {conversation_id}: {e}")
+        raise
+
+
+def get_conversation_summary(conversation_id: str, session_id: str) -> dict:
+    logger.info(f"Retrieving rolling summary for conversation {conversation_id}")
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT summary, summarized_message_id FROM conversations WHERE id = ? AND session_id = ?",
+                (conversation_id, session_id)
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return {"summary": None, "summarized_message_id": 0}
+        return dict(row)
+
+    except Exception as e:
+        logger.error(f"Failed to retrieve summary for conversation {conversation_id}: {e}")
+        raise
+
+
+def update_conversation_summary(conversation_id: str, session_id: str, summary: str, summarized_message_id: int):
+    logger.info(f"Updating rolling summary for conversation {conversation_id} up to message {summarized_message_id}")
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE conversations SET summary = ?, summarized_message_id = ? "
+                "WHERE id = ? AND session_id = ? AND summarized_message_id < ?",
+                (summary, summarized_message_id, conversation_id, session_id, summarized_message_id)
+            )
+
+    except Exception as e:
+        logger.error(f"Failed to update summary for conversation {conversation_id}: {e}")
+        raise
+
+
 def get_conversations_by_session_id(session_id: str) -> list[dict]:
     logger.info(f"Retrieving all conversations for session {session_id}")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            "SELECT id as conversation_id, title FROM conversations WHERE session_id = ? ORDER BY created_at DESC",
-            (session_id,)
-        )
+            cursor.execute(
+                "SELECT id as conversation_id, title FROM conversations WHERE session_id = ? ORDER BY created_at DESC",
+                (session_id,)
+            )
 
-        conversations = cursor.fetchall()
-        conn.close()
+            conversations = cursor.fetchall()
 
-        logger.info(f"Successfully retrieved {len(conversations)} conversations for session {session_id}.")
-        return [dict(row) for row in conversations]
+            logger.info(f"Successfully retrieved {len(conversations)} conversations for session {session_id}.")
+            return [dict(row) for row in conversations]
 
     except Exception as e:
         logger.error(f"Failed to retrieve conversations for session {session_id}: {e}")
@@ -120,24 +158,22 @@ def get_conversations_by_session_id(session_id: str) -> list[dict]:
 def delete_conversation(conversation_id: str, session_id: str):
     logger.info(f"Deleting conversation {conversation_id} for session {session_id}")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            "SELECT 1 FROM conversations WHERE id = ? AND session_id = ?",
-            (conversation_id, session_id)
-        )
-        if cursor.fetchone() is None:
-            logger.warning(f"Unauthorized attempt to delete conversation {conversation_id} by session {session_id}")
-            raise Exception("Conversation not found or access denied.")
+            cursor.execute(
+                "SELECT 1 FROM conversations WHERE id = ? AND session_id = ?",
+                (conversation_id, session_id)
+            )
+            if cursor.fetchone() is None:
+                logger.warning(f"Unauthorized attempt to delete conversation {conversation_id} by session {session_id}")
+                raise Exception("Conversation not found or access denied.")
 
-        cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
 
-        cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
 
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully deleted conversation {conversation_id}.")
+            logger.info(f"Successfully deleted conversation {conversation_id}.")
     except Exception as e:
         logger.error(f"Failed to delete conversation {conversation_id}: {e}")
         raise
@@ -145,27 +181,24 @@ def delete_conversation(conversation_id: str, session_id: str):
 def delete_all_conversations(session_id: str):
     logger.info(f"Deleting all conversations for session {session_id}")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("SELECT id FROM conversations WHERE session_id = ?", (session_id,))
-        conversation_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT id FROM conversations WHERE session_id = ?", (session_id,))
+            conversation_ids = [row[0] for row in cursor.fetchall()]
 
-        if not conversation_ids:
-            logger.info(f"No conversations found for session {session_id}.")
-            conn.close()
-            return
+            if not conversation_ids:
+                logger.info(f"No conversations found for session {session_id}.")
+                return
 
-        cursor.execute("DELETE FROM messages WHERE conversation_id IN ({})".format(
-            ', '.join('?' for _ in conversation_ids)),
-            conversation_ids
-        )
+            cursor.execute("DELETE FROM messages WHERE conversation_id IN ({})".format(
+                ', '.join('?' for _ in conversation_ids)),
+                conversation_ids
+            )
 
-        cursor.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            cursor.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
 
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully deleted all conversations for session {session_id}.")
+            logger.info(f"Successfully deleted all conversations for session {session_id}.")
     except Exception as e:
         logger.error(f"Failed to delete all conversations for session {session_id}: {e}")
         raise
@@ -173,24 +206,22 @@ def delete_all_conversations(session_id: str):
 def update_conversation_title(conversation_id: str, session_id: str, new_title: str):
     logger.info(f"Updating title for conversation {conversation_id} to '{new_title}'")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT 1 FROM conversations WHERE id = ? AND session_id = ?",
-            (conversation_id, session_id)
-        )
-        if cursor.fetchone() is None:
-            logger.warning(f"Unauthorized attempt to update conversation {conversation_id} by session {session_id}")
-            raise Exception("Conversation not found or access denied.")
-
-        cursor.execute(
-            "UPDATE conversations SET title = ? WHERE id = ?",
-            (new_title, conversation_id)
-        )
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully updated title for conversation {conversation_id}.")
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(
+                "SELECT 1 FROM conversations WHERE id = ? AND session_id = ?",
+                (conversation_id, session_id)
+            )
+            if cursor.fetchone() is None:
+                logger.warning(f"Unauthorized attempt to update conversation {conversation_id} by session {session_id}")
+                raise Exception("Conversation not found or access denied.")
+
+            cursor.execute(
+                "UPDATE conversations SET title = ? WHERE id = ?",
+                (new_title, conversation_id)
+            )
+            logger.info(f"Successfully updated title for conversation {conversation_id}.")
     except Exception as e:
         logger.error(f"Failed to update title for conversation {conversation_id}: {e}")
         raise
@@ -199,39 +230,34 @@ def update_conversation_title(conversation_id: str, session_id: str, new_title:
 def update_latest_message_rating(conversation_id: str, session_id: str, rating: str):
     logger.info(f"Updating latest assistant message rating for conversation {conversation_id} to '{rating}'")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT 1 FROM conversations WHERE id = ? AND session_id = ?",
-            (conversation_id, session_id)
-        )
-        if cursor.fetchone() is None:
-             logger.warning(f"Unauthorized attempt to update rating for conversation {conversation_id} by session {session_id}")
-             conn.close()
-             raise Exception("Conversation not found or access denied.")
-
-        
-        cursor.execute(
-            "SELECT id FROM messages WHERE conversation_id = ? AND role = 'assistant' ORDER BY timestamp DESC LIMIT 1",
-            (conversation_id,)
-        )
-        row = cursor.fetchone()
-        if row is None:
-            logger.warning(f"No assistant message found to rate in conversation {conversation_id}")
-            conn.close()
-            return 
-
-        message_id = row['id']
-        
-        cursor.execute(
-            "UPDATE messages SET rating = ? WHERE id = ?",
-            (rating, message_id)
-        )
-        
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully updated rating for message {message_id}.")
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(
+                "SELECT 1 FROM conversations WHERE id = ? AND session_id = ?",
+                (conversation_id, session_id)
+            )
+            if cursor.fetchone() is None:
+                logger.warning(f"Unauthorized attempt to update rating for conversation {conversation_id} by session {session_id}")
+                raise Exception("Conversation not found or access denied.")
+
+            cursor.execute(
+                "SELECT id FROM messages WHERE conversation_id = ? AND role = 'assistant' ORDER BY timestamp DESC LIMIT 1",
+                (conversation_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                logger.warning(f"No assistant message found to rate in conversation {conversation_id}")
+                return
+
+            message_id = row['id']
+
+            cursor.execute(
+                "UPDATE messages SET rating = ? WHERE id = ?",
+                (rating, message_id)
+            )
+
+            logger.info(f"Successfully updated rating for message {message_id}.")
     except Exception as e:
         logger.error(f"Failed to update rating for message in conversation {conversation_id}: {e}")
         raise
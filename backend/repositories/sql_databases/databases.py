@@ -1,58 +1,170 @@
 import sqlite3
 import logging
 import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = './conversations.db'
+ANALYTICS_DATABASE_URL = os.getenv("ANALYTICS_DATABASE_URL", "./downtime_analytics.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
 
-def get_db_connection():
-    logger.info(f"Database connection established. {DATABASE_URL}")
 
-    """Creates and returns a new database connection."""
-    conn = sqlite3.connect(DATABASE_URL)
-    conn.row_factory = sqlite3.Row
-    return conn
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared across threads.
+    Connections run in WAL mode so readers never block the writer, and keep a prepared statement cache.
+    """
+
+    def __init__(self, database_url: str, pool_size: int = DB_POOL_SIZE,
+                 busy_timeout_ms: int = DB_BUSY_TIMEOUT_MS, statement_cache_size: int = DB_STATEMENT_CACHE_SIZE):
+        self.database_url = database_url
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache_size = statement_cache_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _create_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database_url,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with self._lock:
+            self._connections.append(conn)
+        logger.info(f"Database connection established. {self.database_url}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if not self._slots.acquire(timeout=DB_POOL_TIMEOUT_SECONDS):
+            raise TimeoutError(f"Timed out waiting for a database connection to {self.database_url}")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._create_connection()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._idle = queue.LifoQueue()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_url: str = None) -> ConnectionPool:
+    database_url = database_url or DATABASE_URL
+    pool = _pools.get(database_url)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database_url)
+            if pool is None:
+                pool = ConnectionPool(database_url)
+                _pools[database_url] = pool
+    return pool
+
+
+def get_db_connection(database_url: str = None):
+    """
+    Context manager that borrows a pooled connection, commits on success and rolls back on error.
+    Usage: `with get_db_connection() as conn: ...`
+    """
+    return get_pool(database_url).connection()
+
+
+def close_all_connections():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+
+def _add_missing_columns(cursor, table: str, columns: Dict[str, str]):
+    existing_columns = {row['name'] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    for column, definition in columns.items():
+        if column not in existing_columns:
+            logger.info(f"Adding column '{column}' to table '{table}'.")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 
 def initialize_database():
     logger.info("Attempting to initialize the database...")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.executescript("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                conversation_id TEXT NOT NULL,
-                session_id TEXT NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                rating TEXT,
-                timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE INDEX IF NOT EXISTS idx_conversation_timestamp ON messages (conversation_id, timestamp);
-            CREATE TABLE IF NOT EXISTS conversations (
-                id TEXT PRIMARY KEY,
-                session_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE INDEX IF NOT EXISTS idx_session_id ON conversations (session_id);
-            CREATE TABLE IF NOT EXISTS known_issues (
-                id TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                solution TEXT NOT NULL,
-                author TEXT NOT NULL,
-                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        logger.info("Database schema initialized/verified successfully.")
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
 
-        conn.commit()
-        conn.close()
+            cursor.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    rating TEXT,
+                    timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_conversation_timestamp ON messages (conversation_id, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_conversation_session_timestamp
+                    ON messages (conversation_id, session_id, timestamp);
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    summary TEXT,
+                    summarized_message_id INTEGER NOT NULL DEFAULT 0,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_session_id ON conversations (session_id);
+                CREATE TABLE IF NOT EXISTS known_issues (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    solution TEXT NOT NULL,
+                    author TEXT NOT NULL,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS plan_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    plan TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            _add_missing_columns(cursor, "conversations", {
+                "summary": "TEXT",
+                "summarized_message_id": "INTEGER NOT NULL DEFAULT 0",
+            })
+        logger.info("Database schema initialized/verified successfully.")
         logger.info("Database initialization complete.")
     except sqlite3.Error as e:
         logger.error(f"Database initialization failed: {e}")
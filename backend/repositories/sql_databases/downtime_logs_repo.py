@@ -0,0 +1,347 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from repositories.sql_databases.databases import get_db_connection, ANALYTICS_DATABASE_URL, _add_missing_columns
+from repositories.sql_databases import downtime_rollups_repo
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Metadata field names used in Chroma filters -> columns of the downtime_logs table.
+COLUMN_MAP = {
+    "Line": "line",
+    "Downtime Minutes": "downtime_minutes",
+    "Timestamp_unix": "timestamp_unix",
+    "Timestamp": "timestamp",
+}
+
+COMPARISON_OPERATORS = {
+    "$eq": "=",
+    "$ne": "!=",
+    "$gt": ">",
+    "$gte": ">=",
+    "$lt": "<",
+    "$lte": "<=",
+}
+
+
+class UnsupportedFilterError(ValueError):
+    """Raised when a Chroma-style filter cannot be translated to SQL for the analytics store."""
+
+
+def initialize_downtime_logs_store():
+    logger.info("Initializing downtime logs analytics store...")
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS downtime_logs (
+                id TEXT PRIMARY KEY,
+                line TEXT,
+                timestamp TEXT,
+                timestamp_unix INTEGER,
+                downtime_minutes INTEGER NOT NULL DEFAULT 0,
+                notes TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_downtime_logs_line_timestamp ON downtime_logs (line, timestamp_unix);
+            CREATE INDEX IF NOT EXISTS idx_downtime_logs_timestamp ON downtime_logs (timestamp_unix);
+            CREATE TABLE IF NOT EXISTS cause_clusters (
+                cluster_id INTEGER PRIMARY KEY,
+                label TEXT,
+                centroid BLOB NOT NULL,
+                member_count INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS note_embeddings (
+                model_name TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (model_name, content_hash)
+            );
+            CREATE TABLE IF NOT EXISTS ingest_state (
+                source TEXT PRIMARY KEY,
+                watermark INTEGER NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS downtime_rollups (
+                grain TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                line TEXT,
+                downtime_minutes INTEGER NOT NULL DEFAULT 0,
+                event_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_downtime_rollups_bucket
+                ON downtime_rollups (grain, bucket_start, line);
+            CREATE INDEX IF NOT EXISTS idx_downtime_rollups_line ON downtime_rollups (grain, line, bucket_start);
+            CREATE INDEX IF NOT EXISTS idx_downtime_logs_minutes ON downtime_logs (downtime_minutes);
+            CREATE INDEX IF NOT EXISTS idx_downtime_logs_notes ON downtime_logs (notes);
+        """)
+        cursor = conn.cursor()
+        _add_missing_columns(cursor, "downtime_logs", {
+            "cluster_id": "INTEGER",
+            "content_hash": "TEXT",
+            "row_hash": "TEXT",
+        })
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_downtime_logs_cluster ON downtime_logs (cluster_id)")
+    if is_populated() and not downtime_rollups_repo.has_rollups():
+        downtime_rollups_repo.rebuild_rollups()
+    logger.info("Downtime logs analytics store initialized.")
+
+
+def where_to_sql(where: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """
+    Translates a Chroma `where` filter ($and/$or, $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin) into a SQL clause.
+    """
+    if not where:
+        return "1 = 1", []
+
+    clauses = []
+    params: List[Any] = []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(value, list):
+                raise UnsupportedFilterError(f"'{key}' expects a list of filters")
+            parts = [where_to_sql(sub_filter) for sub_filter in value]
+            if not parts:
+                continue
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(clause for clause, _ in parts) + ")")
+            for _, sub_params in parts:
+                params.extend(sub_params)
+            continue
+
+        column = COLUMN_MAP.get(key)
+        if column is None:
+            raise UnsupportedFilterError(f"Unknown metadata field '{key}'")
+
+        conditions = value if isinstance(value, dict) else {"$eq": value}
+        for operator, operand in conditions.items():
+            if operator in COMPARISON_OPERATORS:
+                clauses.append(f"{column} {COMPARISON_OPERATORS[operator]} ?")
+                params.append(operand)
+            elif operator in ("$in", "$nin"):
+                if not operand:
+                    clauses.append("1 = 0" if operator == "$in" else "1 = 1")
+                    continue
+                placeholders = ", ".join("?" for _ in operand)
+                negation = "NOT " if operator == "$nin" else ""
+                clauses.append(f"{column} {negation}IN ({placeholders})")
+                params.extend(operand)
+            else:
+                raise UnsupportedFilterError(f"Unsupported operator '{operator}' for field '{key}'")
+
+    return " AND ".join(clauses) or "1 = 1", params
+
+
+def is_populated() -> bool:
+    try:
+        with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+            row = conn.execute("SELECT 1 FROM downtime_logs LIMIT 1").fetchone()
+        return row is not None
+    except Exception as e:
+        logger.warning(f"Downtime logs analytics store is unavailable: {e}")
+        return False
+
+
+def upsert_logs(rows: List[Dict[str, Any]]):
+    """
+    Inserts or updates rows shaped like Chroma records: {'id', 'Line', 'Timestamp', 'Timestamp_unix', 'Downtime Minutes', 'Notes'},
+    optionally with the 'content_hash'/'row_hash' used by incremental ingestion. A row keeps its cause cluster unless its notes change.
+    The downtime rollups of the buckets the rows leave or enter are refreshed in the same transaction.
+    """
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        previous_positions = _get_positions(conn, [row['id'] for row in rows])
+        conn.executemany(
+            """
+            INSERT INTO downtime_logs (id, line, timestamp, timestamp_unix, downtime_minutes, notes, content_hash, row_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                line = excluded.line,
+                timestamp = excluded.timestamp,
+                timestamp_unix = excluded.timestamp_unix,
+                downtime_minutes = excluded.downtime_minutes,
+                cluster_id = CASE WHEN downtime_logs.notes IS excluded.notes THEN downtime_logs.cluster_id END,
+                notes = excluded.notes,
+                content_hash = excluded.content_hash,
+                row_hash = excluded.row_hash
+            """,
+            [
+                (row['id'], row.get('Line'), row.get('Timestamp'), row.get('Timestamp_unix'),
+                 row.get('Downtime Minutes', 0), row.get('Notes'), row.get('content_hash'), row.get('row_hash'))
+                for row in rows
+            ]
+        )
+        downtime_rollups_repo.refresh_rollups(
+            conn, previous_positions + [(row.get('Line'), row.get('Timestamp_unix')) for row in rows])
+    logger.info(f"Upserted {len(rows)} rows into the downtime logs analytics store.")
+
+
+def _get_positions(conn, ids: List[str], chunk_size: int = 900) -> List[Tuple[Optional[str], Optional[int]]]:
+    """(line, timestamp_unix) of the stored logs with these ids, i.e. the rollup buckets they currently count in."""
+    positions = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = list(ids[start:start + chunk_size])
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"SELECT line, timestamp_unix FROM downtime_logs WHERE id IN ({placeholders})", chunk
+        ).fetchall()
+        positions.extend((row['line'], row['timestamp_unix']) for row in rows)
+    return positions
+
+
+def get_stored_hashes(ids: List[str], chunk_size: int = 900) -> Dict[str, Tuple[str, str]]:
+    """Returns {id: (content_hash, row_hash)} for the ids already in the store."""
+    hashes = {}
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        for start in range(0, len(ids), chunk_size):
+            chunk = list(ids[start:start + chunk_size])
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT id, content_hash, row_hash FROM downtime_logs WHERE id IN ({placeholders})", chunk
+            ).fetchall()
+            hashes.update({row['id']: (row['content_hash'], row['row_hash']) for row in rows})
+    return hashes
+
+
+def get_ingest_watermark(source: str) -> Optional[int]:
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        row = conn.execute("SELECT watermark FROM ingest_state WHERE source = ?", (source,)).fetchone()
+    return row['watermark'] if row else None
+
+
+def set_ingest_watermark(source: str, watermark: int):
+    """Moves the watermark of a source forward; it never goes back."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.execute(
+            """
+            INSERT INTO ingest_state (source, watermark) VALUES (?, ?)
+            ON CONFLICT (source) DO UPDATE SET
+                watermark = MAX(ingest_state.watermark, excluded.watermark),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (source, int(watermark))
+        )
+
+
+def _logs_query(where: Optional[Dict[str, Any]], include: Optional[List[str]],
+                source: str = "downtime_logs") -> Tuple[str, List[Any]]:
+    include = include or ["documents", "metadatas"]
+    columns = ["id AS ids"]
+    if "documents" in include:
+        columns.append("notes AS documents")
+    if "metadatas" in include:
+        columns.append('timestamp_unix AS Timestamp_unix, downtime_minutes AS "Downtime Minutes", '
+                       'line AS Line, timestamp AS Timestamp')
+    if "clusters" in include:
+        columns.append("cluster_id, (SELECT label FROM cause_clusters c WHERE c.cluster_id = downtime_logs.cluster_id) "
+                       "AS cluster_label")
+
+    clause, params = where_to_sql(where)
+    query = f"""
+        SELECT {", ".join(columns)}
+        FROM {source}
+        WHERE {clause}
+    """
+    return query, params
+
+
+def get_logs(where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None) -> "pd.DataFrame":
+    """
+    Returns matching logs as a DataFrame with the same columns ChromaClient.get_items produces, minus embeddings.
+    `include` selects 'documents' (the notes) and/or 'metadatas' (line, timestamps, minutes) like Chroma's include,
+    plus 'clusters' for the stored cause cluster id and label.
+    """
+    query, params = _logs_query(where, include)
+    import pandas as pd  # deferred: the API imports this module at startup but only the agents read frames
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        logs_df = pd.read_sql_query(query, conn, params=params)
+    logger.info(f"Found {len(logs_df)} documents in the downtime logs analytics store.")
+    return logs_df
+
+
+def iter_logs(where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None,
+              page_size: int = 5000) -> Iterator["pd.DataFrame"]:
+    """
+    Like get_logs, but yields the matching logs in id order, in DataFrames of at most `page_size` rows. Pages are
+    read by keyset (id > last id of the previous page), each with its own pooled connection, so a consumer that
+    stops early or pauses between pages does not hold a connection.
+    """
+    query, params = _logs_query(where, include)
+    page_query = f"{query} AND id > ? ORDER BY id LIMIT ?"
+    import pandas as pd
+    last_id = ""
+    while True:
+        with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+            logs_df = pd.read_sql_query(page_query, conn, params=[*params, last_id, page_size])
+        if logs_df.empty:
+            return
+        yield logs_df
+        if len(logs_df) < page_size:
+            return
+        last_id = logs_df['ids'].iloc[-1]
+
+
+def get_distinct_notes() -> List[str]:
+    """Every distinct non-empty note, in a stable order."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT notes FROM downtime_logs WHERE notes IS NOT NULL AND notes != '' ORDER BY notes"
+        ).fetchall()
+    return [row['notes'] for row in rows]
+
+
+def get_logs_for_notes(notes: List[str], where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None,
+                       limit: int = 10) -> "pd.DataFrame":
+    """
+    Up to `limit` logs matching `where` whose notes are in the ranked `notes`, ordered by that ranking and then
+    newest first. Same columns as get_logs.
+    """
+    notes = notes or [None]
+    query, params = _logs_query(
+        where, include, source="ranked_notes JOIN downtime_logs ON downtime_logs.notes = ranked_notes.note")
+    ranked_query = f"""
+        WITH ranked_notes (note, note_rank) AS (VALUES {", ".join("(?, ?)" for _ in notes)})
+        {query}
+        ORDER BY ranked_notes.note_rank, timestamp_unix DESC, id
+        LIMIT ?
+    """
+    ranked_params = [value for rank, note in enumerate(notes) for value in (note, rank)]
+    import pandas as pd
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        return pd.read_sql_query(ranked_query, conn, params=ranked_params + params + [limit])
+
+
+def get_top_logs(where: Optional[Dict[str, Any]] = None, limit: int = 5) -> List[Dict[str, Any]]:
+    """The `limit` matching logs with the most downtime, longest first, as {'minutes', 'note', 'line', 'timestamp'}."""
+    clause, params = where_to_sql(where)
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT downtime_minutes, notes, line, timestamp FROM downtime_logs
+            WHERE {clause}
+            ORDER BY downtime_minutes DESC, timestamp_unix, id
+            LIMIT ?
+            """,
+            params + [limit]
+        ).fetchall()
+    return [{"minutes": int(row['downtime_minutes'] or 0), "note": row['notes'] or "No notes provided",
+             "line": row['line'], "timestamp": row['timestamp']} for row in rows]
+
+
+def aggregate_by_line(where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Total downtime minutes and event count per line of the matching logs, computed in SQL."""
+    clause, params = where_to_sql(where)
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT line, SUM(downtime_minutes) AS downtime_minutes, COUNT(*) AS event_count
+            FROM downtime_logs
+            WHERE {clause}
+            GROUP BY line
+            """,
+            params
+        ).fetchall()
+    return [{"line": row['line'], "downtime_minutes": int(row['downtime_minutes'] or 0),
+             "event_count": int(row['event_count'])} for row in rows]
@@ -0,0 +1,245 @@
+import logging
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from repositories.sql_databases.databases import get_db_connection, ANALYTICS_DATABASE_URL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 24 * HOUR_SECONDS
+WEEK_SECONDS = 7 * DAY_SECONDS
+# Unix time 0 is a Thursday; ISO weeks start on Monday 1970-01-05.
+WEEK_OFFSET_SECONDS = 4 * DAY_SECONDS
+
+# Rollup grains from finest to coarsest; each bucket of a grain is made of whole buckets of the previous one.
+GRAINS = [("hour", HOUR_SECONDS), ("day", DAY_SECONDS), ("week", WEEK_SECONDS)]
+RANGE_OPERATORS = ("$gte", "$gt", "$lte", "$lt", "$eq")
+
+# A planned piece of a time range: (grain, start, end), where grain None means raw rows and start/end None is
+# unbounded. plan_range never yields an unbounded raw segment, so (None, None, None) stands for logs without a timestamp.
+Segment = Tuple[Optional[str], Optional[int], Optional[int]]
+
+
+def floor_bucket(timestamp: int, grain: str) -> int:
+    size = dict(GRAINS)[grain]
+    offset = WEEK_OFFSET_SECONDS if grain == "week" else 0
+    return timestamp - (timestamp - offset) % size
+
+
+def ceil_bucket(timestamp: int, grain: str) -> int:
+    start = floor_bucket(timestamp, grain)
+    return start if start == timestamp else start + dict(GRAINS)[grain]
+
+
+def refresh_rollups(conn: sqlite3.Connection, line_timestamps: Iterable[Tuple[Optional[str], Optional[int]]]):
+    """
+    Recomputes the hour, day and week buckets touched by the given (line, timestamp_unix) pairs, inside the
+    caller's transaction. Hours are re-summed from the raw rows, days from hours and weeks from days.
+    Callers pass both the old and the new position of every changed log so moved rows leave their old bucket.
+    """
+    keys = {(line, int(timestamp)) for line, timestamp in line_timestamps if timestamp is not None}
+    if not keys:
+        return
+    previous_grain = None
+    for grain, size in GRAINS:
+        buckets = sorted({(line, floor_bucket(timestamp, grain)) for line, timestamp in keys},
+                         key=lambda key: (key[0] is None, key[0] or "", key[1]))
+        conn.executemany("DELETE FROM downtime_rollups WHERE grain = ? AND line IS ? AND bucket_start = ?",
+                         [(grain, line, start) for line, start in buckets])
+        if previous_grain is None:
+            conn.executemany(
+                """
+                INSERT INTO downtime_rollups (grain, bucket_start, line, downtime_minutes, event_count)
+                SELECT ?, ?, line, SUM(downtime_minutes), COUNT(*) FROM downtime_logs
+                WHERE line IS ? AND timestamp_unix >= ? AND timestamp_unix < ?
+                GROUP BY line
+                """,
+                [(grain, start, line, start, start + size) for line, start in buckets]
+            )
+        else:
+            conn.executemany(
+                """
+                INSERT INTO downtime_rollups (grain, bucket_start, line, downtime_minutes, event_count)
+                SELECT ?, ?, line, SUM(downtime_minutes), SUM(event_count) FROM downtime_rollups
+                WHERE grain = ? AND line IS ? AND bucket_start >= ? AND bucket_start < ?
+                GROUP BY line
+                """,
+                [(grain, start, previous_grain, line, start, start + size) for line, start in buckets]
+            )
+        previous_grain = grain
+
+
+def rebuild_rollups():
+    """Recomputes every rollup bucket from the raw logs, e.g. for a store created before rollups existed."""
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.execute("DELETE FROM downtime_rollups")
+        conn.execute(
+            """
+            INSERT INTO downtime_rollups (grain, bucket_start, line, downtime_minutes, event_count)
+            SELECT 'hour', timestamp_unix - timestamp_unix % ?, line, SUM(downtime_minutes), COUNT(*)
+            FROM downtime_logs WHERE timestamp_unix IS NOT NULL
+            GROUP BY line, timestamp_unix - timestamp_unix % ?
+            """,
+            (HOUR_SECONDS, HOUR_SECONDS)
+        )
+        conn.execute(
+            """
+            INSERT INTO downtime_rollups (grain, bucket_start, line, downtime_minutes, event_count)
+            SELECT 'day', bucket_start - bucket_start % ?, line, SUM(downtime_minutes), SUM(event_count)
+            FROM downtime_rollups WHERE grain = 'hour'
+            GROUP BY line, bucket_start - bucket_start % ?
+            """,
+            (DAY_SECONDS, DAY_SECONDS)
+        )
+        conn.execute(
+            """
+            INSERT INTO downtime_rollups (grain, bucket_start, line, downtime_minutes, event_count)
+            SELECT 'week', bucket_start - (bucket_start - ?) % ?, line, SUM(downtime_minutes), SUM(event_count)
+            FROM downtime_rollups WHERE grain = 'day'
+            GROUP BY line, bucket_start - (bucket_start - ?) % ?
+            """,
+            (WEEK_OFFSET_SECONDS, WEEK_SECONDS, WEEK_OFFSET_SECONDS, WEEK_SECONDS)
+        )
+        bucket_count = conn.execute("SELECT COUNT(*) FROM downtime_rollups").fetchone()[0]
+    logger.info(f"Rebuilt downtime rollups: {bucket_count} buckets.")
+
+
+def has_rollups() -> bool:
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        row = conn.execute("SELECT 1 FROM downtime_rollups LIMIT 1").fetchone()
+    return row is not None
+
+
+def plan_range(start: Optional[int], end: Optional[int]) -> List[Segment]:
+    """
+    Splits the half-open range [start, end) into the coarsest whole rollup buckets that fit, plus raw-row
+    segments for the partial hours at either edge. A quarter becomes ~13 weeks, a few days and hours and two
+    sub-hour edges, whatever the number of logs in it.
+    """
+    if start is not None and end is not None and start >= end:
+        return []
+    segments: List[Segment] = []
+    level, low, high = None, start, end
+    for grain, _ in GRAINS:
+        inner_low = None if low is None else ceil_bucket(low, grain)
+        inner_high = None if high is None else floor_bucket(high, grain)
+        if inner_low is not None and inner_high is not None and inner_low >= inner_high:
+            break
+        if low is not None and low < inner_low:
+            segments.append((level, low, inner_low))
+        if high is not None and inner_high < high:
+            segments.append((level, inner_high, high))
+        level, low, high = grain, inner_low, inner_high
+    segments.append((level, low, high))
+    return segments
+
+
+def parse_range_filter(where: Optional[Dict[str, Any]]) -> Optional[Tuple[Optional[List[str]], Optional[int], Optional[int]]]:
+    """
+    Reduces a Chroma `where` filter to (lines, start, end) with a half-open time range, when it only combines
+    Timestamp_unix bounds and Line equality/$in with $and. Returns None for any other filter.
+    """
+    lines: Optional[set] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+    def visit(condition) -> bool:
+        nonlocal lines, start, end
+        if not isinstance(condition, dict):
+            return False
+        for key, value in condition.items():
+            if key == "$and":
+                if not isinstance(value, list) or not all(visit(item) for item in value):
+                    return False
+            elif key == "Line":
+                operators = value if isinstance(value, dict) else {"$eq": value}
+                for operator, operand in operators.items():
+                    if operator == "$eq" and isinstance(operand, str):
+                        values = {operand}
+                    elif operator == "$in" and isinstance(operand, list) and all(isinstance(v, str) for v in operand):
+                        values = set(operand)
+                    else:
+                        return False
+                    lines = values if lines is None else lines & values
+            elif key == "Timestamp_unix":
+                operators = value if isinstance(value, dict) else {"$eq": value}
+                for operator, operand in operators.items():
+                    if operator not in RANGE_OPERATORS or isinstance(operand, bool) or not isinstance(operand, int):
+                        return False
+                    if operator in ("$gte", "$gt", "$eq"):
+                        bound = operand + (1 if operator == "$gt" else 0)
+                        start = bound if start is None else max(start, bound)
+                    if operator in ("$lte", "$lt", "$eq"):
+                        bound = operand + (0 if operator == "$lt" else 1)
+                        end = bound if end is None else min(end, bound)
+            else:
+                return False
+        return True
+
+    if where and not visit(where):
+        return None
+    return (sorted(lines) if lines is not None else None), start, end
+
+
+def _segment_query(segment: Segment, lines: Optional[List[str]]) -> Tuple[str, List[Any]]:
+    grain, start, end = segment
+    if grain is None:
+        query = "SELECT line, SUM(downtime_minutes) AS minutes, COUNT(*) AS events FROM downtime_logs WHERE "
+        time_column, clauses, params = "timestamp_unix", [], []
+    else:
+        query = "SELECT line, downtime_minutes AS minutes, event_count AS events FROM downtime_rollups WHERE "
+        time_column, clauses, params = "bucket_start", ["grain = ?"], [grain]
+    if start is not None:
+        clauses.append(f"{time_column} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{time_column} < ?")
+        params.append(end)
+    if grain is None and start is None and end is None:
+        clauses.append("timestamp_unix IS NULL")
+    if lines is not None:
+        clauses.append(f"line IN ({', '.join('?' for _ in lines)})")
+        params.extend(lines)
+    query += " AND ".join(clauses)
+    if grain is None:
+        query += " GROUP BY line"
+    return query, params
+
+
+def aggregate_downtime(where: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Total downtime minutes and event count per line for a date-range/line filter, read from the rollups with
+    raw rows only for the partial buckets at the range edges. Returns None when the filter cannot be
+    answered from the rollups; the caller then falls back to the raw logs.
+    """
+    parsed = parse_range_filter(where)
+    if parsed is None:
+        return None
+    lines, start, end = parsed
+    if lines == []:
+        return []
+
+    segments = plan_range(start, end)
+    if start is None and end is None:
+        # Without a time bound, logs that have no timestamp count as well; they are never in a rollup.
+        segments.append((None, None, None))
+    if not segments:
+        return []
+    parts = [_segment_query(segment, lines) for segment in segments]
+
+    union = " UNION ALL ".join(query for query, _ in parts)
+    params = [param for _, segment_params in parts for param in segment_params]
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT line, SUM(minutes) AS downtime_minutes, SUM(events) AS event_count
+            FROM ({union})
+            GROUP BY line
+            """,
+            params
+        ).fetchall()
+    logger.info(f"Answered downtime aggregate from rollups with {len(segments)} segments: {len(rows)} lines.")
+    return [{"line": row["line"], "downtime_minutes": int(row["downtime_minutes"] or 0),
+             "event_count": int(row["event_count"] or 0)} for row in rows]
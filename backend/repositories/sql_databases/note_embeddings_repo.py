@@ -0,0 +1,42 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from repositories.sql_databases.databases import get_db_connection, ANALYTICS_DATABASE_URL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def get_embeddings(model_name: str, content_hashes: List[str], chunk_size: int = 900) -> Dict[str, np.ndarray]:
+    """Returns {content_hash: float32 embedding} for the notes already embedded with the given model."""
+    embeddings = {}
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        for start in range(0, len(content_hashes), chunk_size):
+            chunk = list(content_hashes[start:start + chunk_size])
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT content_hash, embedding FROM note_embeddings "
+                f"WHERE model_name = ? AND content_hash IN ({placeholders})",
+                [model_name] + chunk
+            ).fetchall()
+            embeddings.update({row['content_hash']: np.frombuffer(row['embedding'], dtype=np.float32) for row in rows})
+    return embeddings
+
+
+def save_embeddings(model_name: str, items: Iterable[Tuple[str, np.ndarray]]):
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO note_embeddings (model_name, content_hash, embedding) VALUES (?, ?, ?)",
+            [(model_name, content_hash, np.asarray(embedding, dtype=np.float32).tobytes())
+             for content_hash, embedding in items]
+        )
+
+
+def clear_embeddings(model_name: str = None):
+    with get_db_connection(ANALYTICS_DATABASE_URL) as conn:
+        if model_name:
+            conn.execute("DELETE FROM note_embeddings WHERE model_name = ?", (model_name,))
+        else:
+            conn.execute("DELETE FROM note_embeddings")
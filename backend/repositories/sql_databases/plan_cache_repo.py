@@ -0,0 +1,40 @@
+import logging
+import time
+from typing import Optional
+from repositories.sql_databases.databases import get_db_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def get_plan(cache_key: str) -> Optional[str]:
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT plan FROM plan_cache WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, time.time())
+            )
+            row = cursor.fetchone()
+        return row['plan'] if row else None
+    except Exception as e:
+        logger.error(f"Failed to read cached plan {cache_key}: {e}")
+        return None
+
+
+def save_plan(cache_key: str, plan: str, expires_at: float):
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO plan_cache (cache_key, plan, expires_at) VALUES (?, ?, ?)",
+                (cache_key, plan, expires_at)
+            )
+            cursor.execute("DELETE FROM plan_cache WHERE expires_at <= ?", (time.time(),))
+    except Exception as e:
+        logger.error(f"Failed to persist cached plan {cache_key}: {e}")
+
+
+def clear_plans():
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM plan_cache")
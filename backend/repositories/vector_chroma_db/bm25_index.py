@@ -0,0 +1,123 @@
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from repositories.sql_databases import downtime_logs_repo
+
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "./chroma_db/notes_bm25.json")
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens, so 'PLC/HMI' matches 'plc' and 'hmi' and 'pogo-pin' matches 'pogo pin'."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the distinct cleaned notes. Notes repeat heavily across logs, so each distinct note is one
+    document; callers expand a ranked note back to its logs. Term weights are precomputed, so a search only
+    sums the postings of the query terms.
+    """
+
+    def __init__(self, notes: List[str], postings: Dict[str, List[Tuple[int, float]]]):
+        self.notes = notes
+        self.postings = postings
+
+    @classmethod
+    def build(cls, notes: List[str], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        term_counts = [Counter(tokenize(note)) for note in notes]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        document_frequency = Counter(term for counts in term_counts for term in counts)
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for note_index, (counts, length) in enumerate(zip(term_counts, lengths)):
+            norm = k1 * (1 - b + b * length / average_length) if average_length else k1
+            for term, frequency in counts.items():
+                idf = math.log(1 + (len(notes) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                postings.setdefault(term, []).append((note_index, idf * frequency * (k1 + 1) / (frequency + norm)))
+        return cls(notes, postings)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def has_terms(self, terms: List[str]) -> bool:
+        return bool(terms) and all(term in self.postings for term in terms)
+
+    def search(self, query: str, limit: int, require_all: bool = False) -> List[Tuple[str, float]]:
+        """Returns up to `limit` (note, score) pairs, best first. With `require_all`, only notes containing every term."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in terms:
+            for note_index, weight in self.postings.get(term, ()):
+                scores[note_index] = scores.get(note_index, 0.0) + weight
+                matched[note_index] = matched.get(note_index, 0) + 1
+        if require_all:
+            scores = {note_index: score for note_index, score in scores.items() if matched[note_index] == len(terms)}
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.notes[note_index], score) for note_index, score in best]
+
+    def save(self, path: str = BM25_INDEX_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as index_file:
+            json.dump({"notes": self.notes, "postings": self.postings}, index_file)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH) -> "BM25Index":
+        with open(path, encoding="utf-8") as index_file:
+            stored = json.load(index_file)
+        postings = {term: [(note_index, weight) for note_index, weight in entries]
+                    for term, entries in stored["postings"].items()}
+        return cls(stored["notes"], postings)
+
+
+_index_lock = threading.Lock()
+_loaded_index: Optional[BM25Index] = None
+_loaded_mtime: Optional[float] = None
+
+
+def get_bm25_index(path: str = BM25_INDEX_PATH) -> Optional[BM25Index]:
+    """The persisted index, reloaded when a seed run rewrites the file; None until one has been built."""
+    global _loaded_index, _loaded_mtime
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    with _index_lock:
+        if _loaded_index is None or mtime != _loaded_mtime:
+            _loaded_index = BM25Index.load(path)
+            _loaded_mtime = mtime
+            logger.info(f"Loaded BM25 index over {len(_loaded_index)} distinct notes from {path}.")
+        return _loaded_index
+
+
+def build_bm25_index(path: str = BM25_INDEX_PATH) -> BM25Index:
+    """Rebuilds the index from the notes in the analytics store and writes it next to the Chroma collections."""
+    index = BM25Index.build(downtime_logs_repo.get_distinct_notes())
+    index.save(path)
+    logger.info(f"Built BM25 index over {len(index)} distinct notes ({len(index.postings)} terms) at {path}.")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BM25 index over the cleaned downtime log notes.")
+    parser.add_argument("--path", default=BM25_INDEX_PATH)
+    args = parser.parse_args()
+    downtime_logs_repo.initialize_downtime_logs_store()
+    print(f"Indexed {len(build_bm25_index(args.path))} distinct notes.")
@@ -0,0 +1,160 @@
+import argparse
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import kmeans_plusplus
+
+from repositories.sql_databases import cause_clusters_repo, downtime_logs_repo
+
+CAUSE_CLUSTER_COUNT = int(os.getenv("CAUSE_CLUSTER_COUNT", "20"))
+CAUSE_CLUSTER_BATCH_SIZE = int(os.getenv("CAUSE_CLUSTER_BATCH_SIZE", "1024"))
+CAUSE_CLUSTER_RANDOM_STATE = 42
+
+logger = logging.getLogger(__name__)
+
+
+class CauseClusterModel:
+    """
+    Sequential k-means over note embeddings. Each batch is assigned to its nearest centroids, which then move to
+    the running mean of all their members, so new logs can be clustered without refitting the old ones.
+
+    This is the centroid update of MiniBatchKMeans.partial_fit without its random reassignment of small clusters
+    (reassignment_ratio=0). The estimator is not used directly because resuming it needs its private `_counts`
+    state; here the whole model is the centroids and member counts stored in cause_clusters.
+    """
+
+    def __init__(self, centroids: Optional[np.ndarray] = None, counts: Optional[np.ndarray] = None,
+                 n_clusters: int = CAUSE_CLUSTER_COUNT):
+        self.centroids = centroids
+        self.counts = counts
+        self.n_clusters = n_clusters
+
+    @classmethod
+    def load(cls) -> "CauseClusterModel":
+        stored = cause_clusters_repo.load_centroids()
+        if stored is None:
+            return cls()
+        centroids, counts = stored
+        return cls(centroids=centroids, counts=counts, n_clusters=len(centroids))
+
+    def save(self):
+        if self.centroids is not None:
+            cause_clusters_repo.save_centroids(self.centroids, self.counts)
+
+    def predict(self, embeddings: np.ndarray) -> np.ndarray:
+        # Squared euclidean distances without materializing the (n, k, dim) difference tensor.
+        distances = (
+            np.einsum('ij,ij->i', embeddings, embeddings)[:, None]
+            - 2 * embeddings @ self.centroids.T
+            + np.einsum('ij,ij->i', self.centroids, self.centroids)[None, :]
+        )
+        return distances.argmin(axis=1)
+
+    def partial_fit(self, embeddings: np.ndarray) -> np.ndarray:
+        """Assigns a batch to clusters, updates the centroids and returns the batch's cluster ids."""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.centroids is None:
+            n_clusters = min(self.n_clusters, len(embeddings))
+            self.centroids, _ = kmeans_plusplus(embeddings, n_clusters, random_state=CAUSE_CLUSTER_RANDOM_STATE)
+            self.centroids = self.centroids.astype(np.float32)
+            self.counts = np.zeros(n_clusters, dtype=np.int64)
+
+        labels = self.predict(embeddings)
+        batch_counts = np.bincount(labels, minlength=len(self.centroids))
+        batch_sums = np.zeros_like(self.centroids)
+        np.add.at(batch_sums, labels, embeddings)
+
+        updated = batch_counts > 0
+        totals = self.counts[updated] + batch_counts[updated]
+        self.centroids[updated] = (
+            self.centroids[updated] * (self.counts[updated] / totals)[:, None] + batch_sums[updated] / totals[:, None]
+        )
+        self.counts = self.counts + batch_counts
+        return labels
+
+
+def update_cause_clusters(ids: List[str], embeddings: np.ndarray,
+                          batch_size: int = CAUSE_CLUSTER_BATCH_SIZE) -> int:
+    """Clusters the given logs incrementally, stores their assignments, the centroids and refreshed labels."""
+    if not ids:
+        return 0
+    model = CauseClusterModel.load()
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start:start + batch_size]
+        labels = model.partial_fit(embeddings[start:start + batch_size])
+        cause_clusters_repo.assign_clusters(zip(labels, batch_ids))
+    model.save()
+    cause_clusters_repo.refresh_labels()
+    logger.info(f"Assigned {len(ids)} downtime logs to {len(model.centroids)} cause clusters.")
+    return len(ids)
+
+
+def fetch_embeddings(chroma_client, ids: List[str],
+                     batch_size: int = CAUSE_CLUSTER_BATCH_SIZE) -> Tuple[List[str], np.ndarray]:
+    """Reads the note embeddings of the given logs from Chroma; returns the ids found, in the given order, and their matrix."""
+    found_ids, embeddings = [], []
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start:start + batch_size]
+        results = chroma_client.collection.get(ids=batch_ids, include=['embeddings'])
+        # Keep the stored order so reruns over the same data produce the same clusters.
+        embedding_by_id = dict(zip(results['ids'], results['embeddings']))
+        for log_id in batch_ids:
+            if log_id in embedding_by_id:
+                found_ids.append(log_id)
+                embeddings.append(embedding_by_id[log_id])
+    return found_ids, np.asarray(embeddings, dtype=np.float32)
+
+
+def assign_nearest_clusters(chroma_client, ids: List[str]) -> pd.DataFrame:
+    """
+    Assigns logs that the background job has not clustered yet to the nearest stored centroid, without moving the
+    centroids or storing the assignment. Returns a frame with columns ids, cluster_id, cluster_label; logs
+    without an embedding in Chroma are left out.
+    """
+    model = CauseClusterModel.load()
+    found_ids, embeddings = fetch_embeddings(chroma_client, ids) if model.centroids is not None else ([], None)
+    if not found_ids:
+        return pd.DataFrame(columns=['ids', 'cluster_id', 'cluster_label'])
+    cluster_ids = model.predict(embeddings)
+    labels = cause_clusters_repo.get_labels()
+    return pd.DataFrame({
+        'ids': found_ids,
+        'cluster_id': cluster_ids,
+        'cluster_label': [labels.get(int(cluster_id)) for cluster_id in cluster_ids],
+    })
+
+
+def cluster_unassigned_logs(chroma_client=None, rebuild: bool = False,
+                            batch_size: int = CAUSE_CLUSTER_BATCH_SIZE) -> int:
+    """
+    Background job: clusters every log with notes that has no cause cluster yet, reading its embedding from Chroma.
+    With `rebuild`, the stored clusters are discarded and all logs are clustered from scratch.
+    """
+    if chroma_client is None:
+        from repositories.vector_chroma_db.chroma_client import ChromaClient
+        chroma_client = ChromaClient(collection_name="downtime_logs")
+
+    if rebuild:
+        cause_clusters_repo.clear_clusters()
+
+    ids = cause_clusters_repo.get_unclustered_ids()
+    if not ids:
+        logger.info("No unclustered downtime logs found.")
+        return 0
+
+    found_ids, embeddings = fetch_embeddings(chroma_client, ids, batch_size)
+    if not found_ids:
+        logger.warning("None of the unclustered downtime logs have embeddings in ChromaDB.")
+        return 0
+    return update_cause_clusters(found_ids, embeddings, batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign downtime logs to precomputed cause clusters.")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the stored clusters and recluster every log.")
+    args = parser.parse_args()
+    downtime_logs_repo.initialize_downtime_logs_store()
+    print(f"Clustered {cluster_unassigned_logs(rebuild=args.rebuild)} downtime logs.")
@@ -1,16 +1,24 @@
 import chromadb
+import os
 import uuid
 import logging
-from typing import List, Dict, Optional, Union
+from typing import Iterator, List, Dict, Optional, Union
+import numpy as np
 import pandas as pd
-from chromadb.utils.embedding_functions.sentence_transformer_embedding_function import \
-    SentenceTransformerEmbeddingFunction
+from repositories.vector_chroma_db.embedding_service import get_embedding_service
+from repositories.vector_chroma_db.embedding_cache import query_embedding_cache
+from repositories.vector_chroma_db.retrieval_result import RetrievalResult
+
+DEFAULT_INCLUDE = ['documents', 'metadatas']
+CHROMA_PAGE_SIZE = int(os.getenv("CHROMA_PAGE_SIZE", "5000"))
+# Query results less similar than this (cosine similarity, -1..1) are dropped before they reach the analysis.
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.3"))
 
 class ChromaClient:
     def __init__(self, collection_name, path: str = "./chroma_db"):
         self.logger = logging.getLogger(__name__)
         self.client = chromadb.PersistentClient(path=path)
-        self.embedding_function = SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+        self.embedding_function = get_embedding_service()
         self.collection = self._get_or_create_collection(collection_name)
 
     def _get_or_create_collection(self, collection_name: str) -> chromadb.Collection:
@@ -42,12 +50,18 @@ class ChromaClient:
         except Exception as e:
             self.logger.info(f"Error adding log embedding to ChromaDB: {e}")
 
+    @property
+    def max_batch_size(self) -> int:
+        return self.client.get_max_batch_size()
+
     def add_items(
             self,
             documents: List[str],
             metadatas: Optional[List[Dict]] = None,
-            ids: Optional[List[str]] = None
+            ids: Optional[List[str]] = None,
+            embeddings: Optional[np.ndarray] = None
     ) -> None:
+        """Adds documents in batches no larger than Chroma's max batch size, using precomputed embeddings when given."""
         if not ids:
             ids = [str(uuid.uuid4().hex) for _ in range(len(documents))]
 
@@ -55,44 +69,117 @@ class ChromaClient:
             self.logger.warning("Length of metadatas does not match length of documents.")
             raise ValueError("Length of metadatas must match length of documents.")
 
+        if embeddings is not None and len(embeddings) != len(documents):
+            raise ValueError("Length of embeddings must match length of documents.")
+
+        batch_size = self.max_batch_size
         try:
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
-            )
+            for start in range(0, len(documents), batch_size):
+                end = start + batch_size
+                self.collection.add(
+                    documents=documents[start:end],
+                    metadatas=metadatas[start:end] if metadatas else None,
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end] if embeddings is not None else None
+                )
             self.logger.info(f"Successfully added {len(documents)} embeddings to collection '{self.collection.name}'.")
         except Exception as e:
             self.logger.error(f"Error adding embeddings to ChromaDB: {e}")
             raise e
 
+    def upsert_items(
+            self,
+            documents: List[str],
+            metadatas: List[Dict],
+            ids: List[str],
+            embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        """Inserts or replaces records by id, in batches no larger than Chroma's max batch size."""
+        batch_size = self.max_batch_size
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self.collection.upsert(
+                ids=ids[start:end],
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                embeddings=embeddings[start:end] if embeddings is not None else None
+            )
+        self.logger.info(f"Successfully upserted {len(ids)} items to collection '{self.collection.name}'.")
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> None:
+        """Updates only the metadata of existing records, leaving documents and embeddings untouched."""
+        batch_size = self.max_batch_size
+        for start in range(0, len(ids), batch_size):
+            self.collection.update(ids=ids[start:start + batch_size], metadatas=metadatas[start:start + batch_size])
+        self.logger.info(f"Successfully updated metadata of {len(ids)} items in collection '{self.collection.name}'.")
+
+    def _to_result(self, ids, documents, metadatas, embeddings, include: List[str]) -> RetrievalResult:
+        columns = {'ids': ids}
+        if 'documents' in include:
+            columns['documents'] = documents
+        results_df = pd.DataFrame(columns)
+        if 'metadatas' in include:
+            results_df = pd.concat([results_df, pd.json_normalize(metadatas)], axis=1)
+        # Embeddings stay out of the frame as one float32 matrix aligned with its rows.
+        embedding_matrix = None
+        if 'embeddings' in include:
+            embedding_matrix = (np.asarray(embeddings, dtype=np.float32) if len(ids)
+                                else np.empty((0, 0), dtype=np.float32))
+        return RetrievalResult(frame=results_df, embeddings=embedding_matrix)
+
+    def _to_similarity(self, distances) -> np.ndarray:
+        """
+        Converts Chroma distances to cosine similarity. The embeddings are unit length, so the default squared L2
+        space gives 2 - 2 * cosine; the cosine and inner-product spaces give 1 - cosine.
+        """
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        distances = np.asarray(distances, dtype=np.float64)
+        return 1 - distances / 2 if space == "l2" else 1 - distances
+
+    @staticmethod
+    def _first_query_result(query_results, field: str):
+        values = query_results.get(field)
+        return values[0] if values is not None else None
+
     def query_items(
             self,
             query_texts: Optional[List[str]] = None,
             where: Optional[Dict[str, Union[str, int, float]]] = None,
-            n_results: int = 5
-    ) -> pd.DataFrame:
+            n_results: int = 5,
+            include: Optional[List[str]] = None,
+            min_similarity: Optional[float] = None
+    ) -> RetrievalResult:
+        """
+        Nearest records to the first query text, best first, with a 'similarity' column.
+        With `min_similarity`, records below it are dropped, so fewer than `n_results` may come back.
+        """
+        include = include or DEFAULT_INCLUDE
         self.logger.info(f"Querying ChromaDB for {query_texts} using {n_results} results in {self.collection.name} collection.")
         try:
+            query_embeddings = query_embedding_cache.get_or_compute(query_texts, self.embedding_function.encode)
             query_results = self.collection.query(
-                query_texts=query_texts,
+                query_embeddings=[embedding.tolist() for embedding in query_embeddings],
                 n_results=n_results,
                 where=where,
-                include=['documents', 'metadatas','embeddings']
+                include=include + ['distances']
             )
 
             if query_results:
-                meta_df = pd.json_normalize(query_results['metadatas'][0])
-                query_results_df = pd.DataFrame({
-                        'ids': query_results['ids'][0],
-                        'documents': query_results['documents'][0],
-                        'embeddings': query_results['embeddings'][0],
-                })
-
-                final_df = pd.concat([query_results_df, meta_df], axis=1)
-                return final_df
+                result = self._to_result(
+                    query_results['ids'][0],
+                    self._first_query_result(query_results, 'documents'),
+                    self._first_query_result(query_results, 'metadatas'),
+                    self._first_query_result(query_results, 'embeddings'),
+                    include,
+                )
+                result.frame['similarity'] = self._to_similarity(self._first_query_result(query_results, 'distances'))
+                if min_similarity is not None:
+                    result = result.select((result.frame['similarity'] >= min_similarity).to_numpy())
+                    self.logger.info(f"Kept {len(result)} of {len(query_results['ids'][0])} results with similarity "
+                                     f">= {min_similarity}.")
+                return result
             else:
-                return pd.DataFrame()
+                return RetrievalResult()
         except Exception as e:
             self.logger.error(f"Error querying ChromaDB: {e}", exc_info=True)
             raise Exception(f"Failed to query items from ChromaDB: {e}")
@@ -100,28 +187,56 @@ class ChromaClient:
     def get_items(
             self,
             where: Optional[Dict[str, Union[str, int, float]]] = None,
-    ) -> pd.DataFrame:
+            include: Optional[List[str]] = None
+    ) -> RetrievalResult:
+        include = include or DEFAULT_INCLUDE
         try:
             get_results = self.collection.get(
                 where=where,
-                include=['documents', 'metadatas', 'embeddings']
+                include=include
             )
             if get_results:
                 self.logger.info(f"Found {len(get_results['ids'])} documents from ChromaDB.")
-                meta_df = pd.json_normalize(get_results['metadatas'])
-                get_results_df = pd.DataFrame({
-                        'ids': get_results['ids'],
-                        'documents': get_results["documents"],
-                        'embeddings': get_results["embeddings"],
-                    })
-                final_df = pd.concat([get_results_df, meta_df], axis=1)
-                return final_df
+                return self._to_result(
+                    get_results['ids'],
+                    get_results.get('documents'),
+                    get_results.get('metadatas'),
+                    get_results.get('embeddings'),
+                    include,
+                )
             else:
-                return pd.DataFrame()
+                return RetrievalResult()
         except Exception as e:
             self.logger.error(f"Error retrieving logs from ChromaDB: {e}", exc_info=True)
             raise Exception(f"Failed to get items from ChromaDB: {e}")
 
+    def iter_items(
+            self,
+            where: Optional[Dict[str, Union[str, int, float]]] = None,
+            page_size: int = CHROMA_PAGE_SIZE,
+            include: Optional[List[str]] = None
+    ) -> Iterator[RetrievalResult]:
+        """
+        Streams the records matching `where` in pages of at most `page_size` (Chroma's limit/offset), so a broad
+        filter never loads the whole collection into one result.
+        """
+        include = include or DEFAULT_INCLUDE
+        offset = 0
+        while True:
+            try:
+                page = self.collection.get(where=where, include=include, limit=page_size, offset=offset)
+            except Exception as e:
+                self.logger.error(f"Error retrieving logs from ChromaDB: {e}", exc_info=True)
+                raise Exception(f"Failed to get items from ChromaDB: {e}")
+            ids = page['ids'] if page else []
+            if not ids:
+                return
+            self.logger.info(f"Read page of {len(ids)} documents at offset {offset} from ChromaDB.")
+            yield self._to_result(ids, page.get('documents'), page.get('metadatas'), page.get('embeddings'), include)
+            if len(ids) < page_size:
+                return
+            offset += len(ids)
+
     def upsert_single_item(self, id: str, document: str, metadata: Optional[Dict] = None) -> None:
         try:
             metadata = [metadata] if metadata else None
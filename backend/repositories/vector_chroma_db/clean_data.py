@@ -1,17 +1,33 @@
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
 import pandas as pd
 
+HTML_TAG_PATTERN = re.compile('<.*?>')
+HTML_ENTITY_PATTERN = re.compile('&[a-z]+;|&#[0-9]+;')
+LABEL_PATTERNS = [
+    re.compile(r'(?:problem|fix/change)\s*:', re.IGNORECASE),
+    re.compile(r'problem\s*:\s*fix/change\s*:$', re.IGNORECASE),
+    re.compile(r'(?:Issue\s*:|Root Cause\s*:|Notes\s*:)\s*', re.IGNORECASE),
+    re.compile(r'\((?:Updated via TechCenter|created via web)\)\s*', re.IGNORECASE),
+]
+WHITESPACE_PATTERN = re.compile(r'\s+')
 
-def clean_data(df) -> pd.DataFrame:
+
+def clean_data(df, vectorized: bool = True) -> pd.DataFrame:
     requred_columns = ['Timestamp', 'Downtime Minutes', 'Notes']
     for col in requred_columns:
         if col not in df.columns:
             raise ValueError(f"Missing required column: {col}")
 
     df['Notes'] = df['Notes'].fillna('').astype(str)
-    df['Notes'] = df['Notes'].apply(clean_html)
-    df['Notes'] = df['Notes'].apply(remove_labels_and_parenthetical)
-    df['Notes'] = df['Notes'].apply(normalize_whitespace)
+    if vectorized:
+        df['Notes'] = clean_notes(df['Notes'])
+    else:
+        df['Notes'] = df['Notes'].apply(clean_html)
+        df['Notes'] = df['Notes'].apply(remove_labels_and_parenthetical)
+        df['Notes'] = df['Notes'].apply(normalize_whitespace)
     df['Notes'] = df['Notes'].str.lower().str.strip()
 
     df['Timestamp'] = pd.to_datetime(df["Timestamp"], errors='coerce')
@@ -19,6 +35,41 @@ def clean_data(df) -> pd.DataFrame:
     return df
 
 
+def clean_notes(notes: pd.Series) -> pd.Series:
+    """
+    Same steps as clean_html, remove_labels_and_parenthetical and normalize_whitespace, on the whole column.
+    Notes repeat a lot, so each distinct note is cleaned once and the results are mapped back to the rows.
+    """
+    codes, uniques = pd.factorize(notes, use_na_sentinel=False)
+    unique_notes = pd.Series(uniques, dtype=object)
+    unique_notes = unique_notes.str.replace(HTML_TAG_PATTERN, '', regex=True)
+    unique_notes = unique_notes.str.replace(HTML_ENTITY_PATTERN, '', regex=True)
+    for pattern in LABEL_PATTERNS:
+        unique_notes = unique_notes.str.replace(pattern, '', regex=True)
+    unique_notes = unique_notes.str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+    return pd.Series(unique_notes.to_numpy()[codes], index=notes.index, name=notes.name)
+
+
+def clean_chunks(chunks: Iterable[pd.DataFrame], workers: int = 1) -> Iterator[pd.DataFrame]:
+    """
+    Cleans CSV chunks in order. With more than one worker, chunks are cleaned in a process pool with at most
+    two chunks per worker in flight, so memory stays bounded while reading ahead.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield clean_data(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(clean_data, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def clean_html(text):
     if not isinstance(text, str):
         return text
@@ -0,0 +1,78 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+
+def normalize_query_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache mapping normalized query text to its embedding vector.
+    """
+
+    def __init__(self, max_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, texts: List[str], encode: Callable[[List[str]], "np.ndarray"]) -> List["np.ndarray"]:
+        keys = [normalize_query_text(text) for text in texts]
+        vectors: Dict[str, "np.ndarray"] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    vectors[key] = self._entries[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            for key, vector in zip(missing, encode(missing)):
+                vectors[key] = vector
+            with self._lock:
+                for key in missing:
+                    self._put(key, vectors[key])
+
+        return [vectors[key] for key in keys]
+
+    def _put(self, key: str, vector: "np.ndarray") -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+query_embedding_cache = EmbeddingCache()
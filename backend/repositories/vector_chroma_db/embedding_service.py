@@ -0,0 +1,121 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "256"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+
+_EncodeRequest = Tuple[List[str], Future]
+
+
+class EmbeddingService(EmbeddingFunction[Documents]):
+    """
+    Process-wide sentence embedding model shared by every Chroma collection.
+    Concurrent encode calls are queued and micro-batched into a single forward pass by one worker thread.
+    """
+
+    def __init__(
+            self,
+            model_name: str = EMBEDDING_MODEL_NAME,
+            device: str = "cpu",
+            queue_size: int = EMBEDDING_QUEUE_SIZE,
+            max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+            max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+    ):
+        from sentence_transformers import SentenceTransformer
+
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._model = SentenceTransformer(model_name, device=device)
+        self._requests: "queue.Queue[Optional[_EncodeRequest]]" = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+        self._worker.start()
+        self.logger.info(f"EmbeddingService: Loaded model '{model_name}' on {device}.")
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.encode(list(input)).tolist()
+
+    @property
+    def dimension(self) -> int:
+        return self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        future: Future = Future()
+        # Blocks when the queue is full so bursts of traffic apply back-pressure instead of growing memory.
+        self._requests.put((texts, future))
+        return future.result()
+
+    def close(self) -> None:
+        self._requests.put(None)
+        self._worker.join()
+
+    def _run(self) -> None:
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+
+            batch = [request]
+            batch_size = len(request[0])
+            deadline = time.monotonic() + self.max_wait_seconds
+            while batch_size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._encode_batch(batch)
+                    return
+                batch.append(request)
+                batch_size += len(request[0])
+
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: List[_EncodeRequest]) -> None:
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            vectors = self._model.encode(texts, batch_size=self.max_batch_size, convert_to_numpy=True)
+            vectors = vectors.astype(np.float32, copy=False)
+        except Exception as e:
+            self.logger.error(f"EmbeddingService: Failed to encode batch of {len(texts)} texts: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        if len(batch) > 1:
+            self.logger.debug(f"EmbeddingService: Encoded {len(batch)} requests ({len(texts)} texts) in one pass.")
+
+        offset = 0
+        for request_texts, future in batch:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+
+_embedding_service: Optional[EmbeddingService] = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService()
+    return _embedding_service
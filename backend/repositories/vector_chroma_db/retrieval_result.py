@@ -0,0 +1,36 @@
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class RetrievalResult:
+    """
+    Records returned by retrieval: a frame of ids, documents and metadata columns, plus an optional
+    contiguous float32 embedding matrix whose rows are aligned with the frame's rows.
+    """
+    frame: pd.DataFrame = field(default_factory=pd.DataFrame)
+    embeddings: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        if self.embeddings is not None:
+            self.embeddings = np.ascontiguousarray(self.embeddings, dtype=np.float32)
+            if self.embeddings.ndim != 2 or len(self.embeddings) != len(self.frame):
+                raise ValueError(
+                    f"Embedding matrix of shape {self.embeddings.shape} does not match {len(self.frame)} records.")
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def select(self, mask) -> "RetrievalResult":
+        """Returns the rows where `mask` is true; the embedding matrix is only sliced when rows are dropped."""
+        mask = np.asarray(mask, dtype=bool)
+        if mask.all():
+            return self
+        embeddings = self.embeddings[mask] if self.embeddings is not None else None
+        return RetrievalResult(frame=self.frame[mask].reset_index(drop=True), embeddings=embeddings)
@@ -1,15 +1,149 @@
+import argparse
+import hashlib
+import os
+import time
+import uuid
+from typing import Tuple
+import numpy as np
 import pandas as pd
-from repositories.vector_chroma_db.clean_data import clean_data
+from repositories.vector_chroma_db.clean_data import clean_chunks
 from repositories.vector_chroma_db.chroma_client import ChromaClient
+from repositories.vector_chroma_db.cause_clustering import cluster_unassigned_logs
+from repositories.vector_chroma_db.bm25_index import build_bm25_index
+from repositories.vector_chroma_db.embedding_service import EMBEDDING_MODEL_NAME
+from repositories.sql_databases import downtime_logs_repo, note_embeddings_repo
 
+SEED_CSV_PATH = os.getenv("SEED_CSV_PATH", "data/downtime_logs.csv")
+SEED_CHUNK_SIZE = int(os.getenv("SEED_CHUNK_SIZE", "5000"))
+SEED_EMBEDDING_BATCH_SIZE = int(os.getenv("SEED_EMBEDDING_BATCH_SIZE", "256"))
+SEED_CLEAN_WORKERS = int(os.getenv("SEED_CLEAN_WORKERS", "1"))
+# Rows ending this long before the watermark are still re-checked, to pick up late edits in the export.
+INGEST_LOOKBACK_HOURS = int(os.getenv("INGEST_LOOKBACK_HOURS", "72"))
 
-def run_and_seed_db():
-    """This is a placeholder for the run_and_seed_db function."""
-    columns_to_use = ['Timestamp', 'Downtime Minutes', 'Notes', 'Line']
-    print("Reading CSV file...")
+INGEST_SOURCE = "downtime_logs_csv"
+COLUMNS_TO_USE = ['Timestamp', 'Downtime Minutes', 'Notes', 'Line', 'Record ID', 'Downtime End Time']
+METADATA_COLUMNS = ['Timestamp_unix', 'Downtime Minutes', 'Line', 'Timestamp']
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _to_unix(timestamps: pd.Series) -> pd.Series:
+    return timestamps.apply(lambda x: int(x.timestamp() if isinstance(x, pd.Timestamp) else int(x)))
+
+
+def prepare_chunk(cleaned_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the columns stored with each log to a cleaned CSV chunk: a stable id (the export's Record ID),
+    the unix timestamp and the time the event ended.
+    """
+    cleaned_data['Timestamp_unix'] = _to_unix(cleaned_data['Timestamp'])
+    cleaned_data['Timestamp'] = cleaned_data['Timestamp'].astype(str)
+
+    event_end_unix = cleaned_data['Timestamp_unix']
+    if 'Downtime End Time' in cleaned_data.columns:
+        end_times = pd.to_datetime(cleaned_data['Downtime End Time'], errors='coerce')
+        end_unix = end_times.dropna().map(lambda x: int(x.timestamp()))
+        event_end_unix = pd.concat([event_end_unix, end_unix], axis=1).max(axis=1)
+    cleaned_data['event_end_unix'] = event_end_unix.astype(int)
+
+    record_ids = cleaned_data['Record ID'] if 'Record ID' in cleaned_data.columns else pd.Series(
+        None, index=cleaned_data.index, dtype=object)
+    record_ids = record_ids.astype('string').str.strip()
+    missing_ids = record_ids.isna() | (record_ids == '')
+    if missing_ids.any():
+        print(f"Warning: {int(missing_ids.sum())} rows have no Record ID and get random ids; they are not idempotent.")
+        record_ids[missing_ids] = [uuid.uuid4().hex for _ in range(int(missing_ids.sum()))]
+    cleaned_data['id'] = record_ids.astype(str)
+    # A Record ID that appears twice keeps its latest row.
+    return cleaned_data.drop_duplicates('id', keep='last')
+
+
+def add_hashes(cleaned_data: pd.DataFrame) -> pd.DataFrame:
+    """Adds content_hash (the cleaned notes, decides re-embedding) and row_hash (the whole stored record)."""
+    cleaned_data = cleaned_data.copy()
+    cleaned_data['content_hash'] = [hash_text(note) for note in cleaned_data['Notes']]
+    cleaned_data['row_hash'] = [
+        hash_text("\x1f".join(str(value) for value in values))
+        for values in cleaned_data[['content_hash'] + METADATA_COLUMNS].itertuples(index=False, name=None)
+    ]
+    return cleaned_data
+
+
+def embed_notes(embedding_service, notes: pd.Series, content_hashes: pd.Series) -> Tuple[np.ndarray, int]:
+    """
+    Embeds each distinct note once and fans the vector out to every row sharing it. Vectors are looked up in the
+    persistent note-hash cache first; only unseen notes are encoded (on the CPU, in fixed-size batches) and cached.
+    Returns the row-aligned embedding matrix and the number of notes that went through the model.
+    """
+    model_name = getattr(embedding_service, 'model_name', EMBEDDING_MODEL_NAME)
+    codes, unique_hashes = pd.factorize(content_hashes)
+    unique_notes = notes[~content_hashes.duplicated()].tolist()
+
+    vectors = note_embeddings_repo.get_embeddings(model_name, list(unique_hashes))
+    missing = [index for index, content_hash in enumerate(unique_hashes) if content_hash not in vectors]
+    for start in range(0, len(missing), SEED_EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + SEED_EMBEDDING_BATCH_SIZE]
+        encoded = embedding_service.encode([unique_notes[index] for index in batch])
+        new_vectors = {unique_hashes[index]: vector for index, vector in zip(batch, encoded)}
+        note_embeddings_repo.save_embeddings(model_name, new_vectors.items())
+        vectors.update(new_vectors)
+
+    unique_matrix = np.vstack([vectors[content_hash] for content_hash in unique_hashes]).astype(np.float32, copy=False)
+    return unique_matrix[codes], len(missing)
+
+
+def seed_chunk(chroma_client: ChromaClient, cleaned_data: pd.DataFrame, rebuild: bool = False) -> dict:
+    """
+    Writes the new or changed rows of a cleaned chunk to Chroma and the analytics store.
+    Only rows whose notes changed are re-embedded (see embed_notes); rows with only metadata changes get a
+    metadata update, and unchanged rows are skipped. With `rebuild`, every row is written again.
+    """
+    stored_hashes = {} if rebuild else downtime_logs_repo.get_stored_hashes(cleaned_data['id'].tolist())
+    stored_content = cleaned_data['id'].map(lambda log_id: stored_hashes.get(log_id, (None, None))[0])
+    stored_row = cleaned_data['id'].map(lambda log_id: stored_hashes.get(log_id, (None, None))[1])
+
+    needs_embedding = cleaned_data['content_hash'] != stored_content
+    metadata_only = ~needs_embedding & (cleaned_data['row_hash'] != stored_row)
+    to_embed = cleaned_data[needs_embedding]
+    to_update = cleaned_data[metadata_only]
+
+    encoded_count = 0
+    if not to_embed.empty:
+        embeddings, encoded_count = embed_notes(chroma_client.embedding_function, to_embed['Notes'],
+                                                to_embed['content_hash'])
+        chroma_client.upsert_items(
+            to_embed['Notes'].tolist(),
+            to_embed[METADATA_COLUMNS].to_dict(orient='records'),
+            to_embed['id'].tolist(),
+            embeddings=embeddings,
+        )
+
+    if not to_update.empty:
+        chroma_client.update_metadatas(to_update['id'].tolist(), to_update[METADATA_COLUMNS].to_dict(orient='records'))
+
+    changed = cleaned_data[needs_embedding | metadata_only]
+    if not changed.empty:
+        downtime_logs_repo.upsert_logs(
+            changed[['id', 'Line', 'Timestamp', 'Timestamp_unix', 'Downtime Minutes', 'Notes', 'content_hash',
+                     'row_hash']].to_dict(orient='records'))
+
+    return {"embedded": len(to_embed), "encoded": encoded_count, "metadata_updated": len(to_update),
+            "unchanged": len(cleaned_data) - len(changed)}
+
+
+def run_and_seed_db(csv_path: str = SEED_CSV_PATH, chunk_size: int = SEED_CHUNK_SIZE, incremental: bool = False,
+                    clean_workers: int = SEED_CLEAN_WORKERS):
+    """
+    Streams the downtime log export into ChromaDB and the analytics store chunk by chunk, so memory stays flat
+    regardless of the size of the CSV. Logs are keyed on Record ID, so re-running only writes new or changed rows.
+    With `incremental`, rows that ended before the stored watermark (minus INGEST_LOOKBACK_HOURS) are skipped
+    without hashing. `clean_workers` > 1 cleans chunks in a process pool while earlier chunks are embedded.
+    """
     try:
-        csv_path = 'data/downtime_logs.csv'
-        df = pd.read_csv(csv_path, usecols=columns_to_use)
+        chunks = pd.read_csv(csv_path, usecols=lambda column: column in COLUMNS_TO_USE, chunksize=chunk_size,
+                             dtype={'Record ID': str})
     except FileNotFoundError:
         print(f"CSV file not found at {csv_path}. Please ensure 'backend/data/downtime_logs.csv' exists.")
         return
@@ -17,21 +151,66 @@ def run_and_seed_db():
         print(f"An error occurred while reading the CSV file: {e}")
         return
 
-    print("Cleaning data...")
-    cleaned_data = clean_data(df)
-
-    print("Seeding database...")
     chroma_client = ChromaClient(collection_name="downtime_logs", path="./chroma_db")
-    cleaned_data['Timestamp_unix'] = cleaned_data['Timestamp'].apply(
-        lambda x: int(x.timestamp() if isinstance(x, pd.Timestamp) else int(x)))
-    cleaned_data['Timestamp'] = cleaned_data['Timestamp'].astype(str)
+    downtime_logs_repo.initialize_downtime_logs_store()
+
+    # An empty collection next to a populated store (e.g. a deleted chroma_db folder) must be fully re-added;
+    # the note embedding cache keeps that cheap.
+    rebuild = chroma_client.collection.count() == 0 and downtime_logs_repo.is_populated()
+    if rebuild:
+        print("ChromaDB collection is empty, re-adding every row of the export.")
+
+    cutoff = None
+    watermark = downtime_logs_repo.get_ingest_watermark(INGEST_SOURCE)
+    if incremental and watermark is not None and not rebuild:
+        cutoff = watermark - INGEST_LOOKBACK_HOURS * 3600
+        print(f"Incremental ingest: skipping rows that ended before {pd.Timestamp(cutoff, unit='s')}.")
+
+    print(f"Seeding database from {csv_path} in chunks of {chunk_size} rows...")
+    started_at = time.perf_counter()
+    totals = {"rows": 0, "skipped": 0, "embedded": 0, "encoded": 0, "metadata_updated": 0, "unchanged": 0}
+    new_watermark = watermark
+    with chunks:
+        for chunk_number, cleaned_chunk in enumerate(clean_chunks(chunks, clean_workers), start=1):
+            totals["rows"] += len(cleaned_chunk)
+            cleaned_data = prepare_chunk(cleaned_chunk)
+            if not cleaned_data.empty:
+                chunk_watermark = int(cleaned_data['event_end_unix'].max())
+                new_watermark = chunk_watermark if new_watermark is None else max(new_watermark, chunk_watermark)
+            if cutoff is not None:
+                recent = cleaned_data['event_end_unix'] >= cutoff
+                totals["skipped"] += int((~recent).sum())
+                cleaned_data = cleaned_data[recent]
+
+            for key, count in seed_chunk(chroma_client, add_hashes(cleaned_data), rebuild).items():
+                totals[key] += count
+            elapsed = time.perf_counter() - started_at
+            print(f"Chunk {chunk_number}: {totals['rows']} rows read in {elapsed:.1f}s "
+                  f"({totals['rows'] / elapsed if elapsed else 0:.0f} rows/sec), {totals['embedded']} embedded "
+                  f"({totals['encoded']} notes encoded), "
+                  f"{totals['metadata_updated']} metadata updates, {totals['unchanged'] + totals['skipped']} unchanged")
+
+    if new_watermark is not None:
+        downtime_logs_repo.set_ingest_watermark(INGEST_SOURCE, new_watermark)
+
+    print("Assigning cause clusters...")
+    cluster_unassigned_logs(chroma_client)
 
-    documents = cleaned_data['Notes'].tolist()
-    metadatas = cleaned_data[['Timestamp_unix', 'Downtime Minutes', 'Line', 'Timestamp']].to_dict(orient='records')
+    print("Building the BM25 index over notes...")
+    build_bm25_index()
 
-    chroma_client.add_items(documents, metadatas)
-    print("Database seeding complete.")
+    elapsed = time.perf_counter() - started_at
+    print(f"Database seeding complete: {totals['rows']} rows in {elapsed:.1f}s "
+          f"({totals['rows'] / elapsed if elapsed else 0:.0f} rows/sec).")
 
 
 if __name__ == "__main__":
-    run_and_seed_db()
+    parser = argparse.ArgumentParser(description="Load the downtime log export into ChromaDB and the analytics store.")
+    parser.add_argument("--csv", default=SEED_CSV_PATH, help="Path to the downtime log CSV export.")
+    parser.add_argument("--chunk-size", type=int, default=SEED_CHUNK_SIZE, help="CSV rows processed per chunk.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip rows older than the stored watermark instead of re-checking the whole export.")
+    parser.add_argument("--workers", type=int, default=SEED_CLEAN_WORKERS,
+                        help="Processes used to clean CSV chunks in parallel.")
+    args = parser.parse_args()
+    run_and_seed_db(args.csv, args.chunk_size, args.incremental, args.workers)
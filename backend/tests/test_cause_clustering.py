@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+from agents.agent_analysis import AgentAnalysis
+from repositories.vector_chroma_db.cause_clustering import CauseClusterModel
+from repositories.vector_chroma_db.retrieval_result import RetrievalResult
+
+
+def test_partial_fit_matches_minibatch_kmeans():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(4, 16)).astype(np.float32) * 5
+    embeddings = (centers[rng.integers(0, 4, size=600)] + rng.normal(size=(600, 16))).astype(np.float32)
+    initial_centroids = embeddings[:4].copy()
+
+    model = CauseClusterModel(centroids=initial_centroids.copy(), counts=np.zeros(4, dtype=np.int64), n_clusters=4)
+    reference = MiniBatchKMeans(n_clusters=4, init=initial_centroids.copy(), n_init=1, reassignment_ratio=0,
+                                random_state=0)
+    previous_centroids = initial_centroids
+    for start in range(0, len(embeddings), 100):
+        batch = embeddings[start:start + 100]
+        # Both assign the batch to the centroids as they were before the update.
+        expected_labels = ((batch[:, None, :] - previous_centroids[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        labels = model.partial_fit(batch)
+        reference.partial_fit(batch)
+        previous_centroids = reference.cluster_centers_.copy()
+        np.testing.assert_array_equal(labels, expected_labels)
+        np.testing.assert_allclose(model.centroids, reference.cluster_centers_, rtol=1e-4, atol=1e-4)
+    np.testing.assert_array_equal(model.counts, reference._counts.astype(np.int64))
+
+
+def test_stored_clusters_are_used_when_every_log_is_clustered():
+    data = pd.DataFrame({
+        'ids': ['1', '2', '3', '4'],
+        'documents': ['belt jam', 'belt jam', 'sensor', ''],
+        'Downtime Minutes': [10, 20, 5, 7],
+        'cluster_id': [0, 0, 1, None],
+        'cluster_label': ['belt jam', 'belt jam', 'sensor', None],
+    })
+    result = AgentAnalysis().execute_analysis_task({'type': 'cluster_and_aggregate'}, RetrievalResult(frame=data))
+    assert result == {"top_causes": [
+        {"cluster_label": "belt jam", "total_downtime_minutes": 30, "incident_count": 2},
+        {"cluster_label": "sensor", "total_downtime_minutes": 5, "incident_count": 1},
+    ]}
+
+
+def test_unclustered_logs_are_reported_not_dropped():
+    data = pd.DataFrame({
+        'ids': ['1', '2'],
+        'documents': ['belt jam', 'new note'],
+        'Downtime Minutes': [10, 20],
+        'cluster_id': [0, None],
+        'cluster_label': ['belt jam', None],
+    })
+    result = AgentAnalysis().execute_analysis_task({'type': 'cluster_and_aggregate'}, RetrievalResult(frame=data))
+    assert result["unclustered_incident_count"] == 1
+
+
+def test_partially_clustered_logs_with_embeddings_are_clustered_at_query_time():
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({
+        'ids': [str(i) for i in range(6)],
+        'documents': ['belt jam', 'belt jam', 'sensor', 'sensor', 'pin', 'pin'],
+        'Downtime Minutes': [1, 2, 3, 4, 5, 6],
+        'cluster_id': [0, 0, 1, 1, None, None],
+        'cluster_label': ['belt jam', 'belt jam', 'sensor', 'sensor', None, None],
+    })
+    embeddings = rng.normal(size=(6, 8)).astype(np.float32)
+    result = AgentAnalysis().execute_analysis_task({'type': 'cluster_and_aggregate'},
+                                                   RetrievalResult(frame=data, embeddings=embeddings))
+    assert sum(cause["incident_count"] for cause in result["top_causes"]) == 6
+    assert "unclustered_incident_count" not in result
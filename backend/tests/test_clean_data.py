@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from repositories.vector_chroma_db.clean_data import clean_chunks, clean_data
+
+NOTES = [
+    "<p><b>Issue:</b> Jammed Belt<br><b>Root Cause:</b> Debris&nbsp;<br><b>Fix:</b> Cleared</p>",
+    "Problem: sensor misalignment on station 4   Fix/Change: tightened bracket (Updated via TechCenter)",
+    "Notes:   Conveyor belt jam in section 3. Cleared debris and restarted. (created via web)",
+    "problem: fix/change:",
+    "Reseated fixture &#39;A12&#39;\n\tand re-ran   calibration!!",
+    "Température élevée — capteur déréglé (ÉTAPE 3) ✓",
+    "Sensor: ???, ... ; -- \"quoted\" 'pin' / PLC/HMI",
+    " Non-breaking spaces　and Ünïcödé ",
+    "",
+    None,
+    np.nan,
+]
+
+
+def make_frame() -> pd.DataFrame:
+    rows = len(NOTES) * 3
+    return pd.DataFrame({
+        'Timestamp': ["12/30/2025 08:00", "not a date", None] * len(NOTES),
+        'Downtime Minutes': ["45.5", "", "n/a"] * len(NOTES),
+        'Notes': NOTES * 3,
+        'Line': [f"Line{row % 4}-DEMO" for row in range(rows)],
+    })
+
+
+@pytest.fixture(scope="module")
+def expected() -> pd.DataFrame:
+    return clean_data(make_frame(), vectorized=False)
+
+
+def test_vectorized_matches_row_wise(expected):
+    pd.testing.assert_frame_equal(clean_data(make_frame()), expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_chunked_matches_row_wise(expected, workers):
+    frame = make_frame()
+    chunks = (frame.iloc[start:start + 6].copy() for start in range(0, len(frame), 6))
+    pd.testing.assert_frame_equal(pd.concat(list(clean_chunks(chunks, workers))), expected)
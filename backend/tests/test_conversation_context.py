@@ -0,0 +1,77 @@
+import asyncio
+import types
+
+from agents.utils import conversation_context
+from agents.utils.conversation_context import ConversationContextManager
+
+MODEL_ID = "test/model"
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def acreate_completion(self, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="summary"))])
+
+
+def make_manager(monkeypatch, token_budget=30):
+    monkeypatch.setitem(conversation_context._token_counters, MODEL_ID, lambda text: len(text.split()))
+    return ConversationContextManager(MODEL_ID, FakeLLM(), token_budget=token_budget)
+
+
+def make_messages(count):
+    return [{"id": i, "role": "user" if i % 2 else "assistant", "content": f"message {i} " + "word " * 8}
+            for i in range(1, count + 1)]
+
+
+def test_unsummarized_turns_stay_in_the_prompt_beyond_the_budget(monkeypatch):
+    manager = make_manager(monkeypatch)
+    messages = make_messages(6)
+    older, _ = manager.split_history(messages)
+    assert older
+
+    context = manager.build_context(messages, summary=None, summarized_message_id=0)
+    assert [message["content"] for message in context] == [message["content"] for message in messages]
+
+
+def test_summarized_turns_leave_the_prompt(monkeypatch):
+    manager = make_manager(monkeypatch)
+    messages = make_messages(6)
+    context = manager.build_context(messages, summary="earlier", summarized_message_id=4)
+    assert context[0] == {"role": "system", "content": "Summary of the earlier conversation: earlier"}
+    assert [message["content"] for message in context[1:]] == [messages[4]["content"], messages[5]["content"]]
+
+
+def test_summary_folds_every_unsummarized_older_turn(monkeypatch):
+    manager = make_manager(monkeypatch)
+    saved = []
+    monkeypatch.setattr(conversation_context.conversations_repo, "update_conversation_summary",
+                        lambda *args: saved.append(args))
+    messages = make_messages(40)
+    older, _ = manager.split_history(messages, None)
+
+    asyncio.run(manager.aupdate_summary("c", "s", messages, {"summary": None, "summarized_message_id": 0}))
+    assert saved == [("c", "s", "summary", older[-1]["id"])]
+    assert all(message["content"] in manager.llm_service.prompts[0] for message in older)
+
+
+def test_pending_summary_updates_are_awaited_or_cancelled_at_shutdown():
+    import logging
+    from agents.main_agent import MainAgent
+
+    async def run():
+        agent = MainAgent.__new__(MainAgent)
+        agent.name = "MainAgent"
+        agent.logger = logging.getLogger(__name__)
+        agent._background_tasks = set()
+        finished = asyncio.create_task(asyncio.sleep(0))
+        stuck = asyncio.create_task(asyncio.sleep(60))
+        agent._background_tasks.update({finished, stuck})
+        await agent.aclose(timeout=0.1)
+        return finished, stuck
+
+    finished, stuck = asyncio.run(run())
+    assert finished.done() and not finished.cancelled()
+    assert stuck.cancelled()
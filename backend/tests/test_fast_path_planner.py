@@ -0,0 +1,76 @@
+import datetime
+
+import pytest
+
+from agents.utils.fast_path_planner import FastPathPlanner
+
+NOW = datetime.datetime(2025, 7, 30, 14, 0, 0)
+
+
+def plan_for(query: str):
+    return FastPathPlanner().plan(query, NOW)
+
+
+def filters_of(plan) -> dict:
+    return plan["steps"][0]["task"]["filters"]
+
+
+@pytest.mark.parametrize("query, line", [
+    ("What was the total downtime for line MEA204-1 last week?", "MEA204-1"),
+    ("What was the total downtime for line 2?", "2"),
+    ("total downtime on Line2-DEMO this month", "Line2-DEMO"),
+    ("How much downtime was there on line MEA101-DEMO today?", "MEA101-DEMO"),
+])
+def test_line_is_filtered(query, line):
+    plan = plan_for(query)
+    assert plan is not None
+    filters = filters_of(plan)
+    conditions = filters.get("$and", [filters])
+    assert {"Line": line} in conditions
+
+
+def test_line_and_period_are_combined():
+    plan = plan_for("total downtime on Line2-DEMO this month")
+    assert filters_of(plan) == {
+        "$and": [{"Line": "Line2-DEMO"}],
+        "natural_language_date_start": "July 1, 2025 00:00:00",
+        "natural_language_date_end": "now",
+    }
+
+
+@pytest.mark.parametrize("query", [
+    "What was the total downtime last week on lines 2 and 3?",
+    "total downtime for line 2 and line 3 this week",
+    "total downtime not on line MEA204-1 this week",
+    "total downtime this month except line 2",
+    "total downtime this month without Line2-DEMO and Line1-DEMO",
+    "total downtime from events less than 10 minutes this week",
+    "total downtime from events under 5 minutes last month",
+    "list events under 5 minutes last month",
+    "show events longer than 30 minutes but at most 60 minutes",
+    "which line had the most downtime this week, excluding line 2",
+    "which line had the most downtime on line 2 this week",
+    "total downtime for the 3 worst shifts this week",
+    "what is the total downtime for the conveyor this week",
+    "total downtime for the packaging area this week",
+    "which line had the most downtime during maintenance last week",
+    "how much downtime on the south organization this week",
+])
+def test_unparsed_constraints_fall_back_to_the_llm(query):
+    assert plan_for(query) is None
+
+
+@pytest.mark.parametrize("query, analysis_type", [
+    ("How much downtime did we have yesterday across all lines?", "calculate_total_downtime"),
+    ("Which line had the most downtime this quarter?", "aggregate_by_line"),
+    ("Show me all downtime events that were longer than 45 minutes.", "passthrough"),
+])
+def test_common_queries_stay_on_the_fast_path(query, analysis_type):
+    plan = plan_for(query)
+    assert plan is not None
+    assert plan["steps"][1]["task"]["type"] == analysis_type
+
+
+def test_threshold_is_filtered():
+    plan = plan_for("Show me all downtime events that were longer than 45 minutes.")
+    assert filters_of(plan) == {"Downtime Minutes": {"$gt": 45}}
@@ -0,0 +1,44 @@
+from api import warmup
+from api.warmup import WarmupState, run_warmup
+
+
+def fail(message: str):
+    def step():
+        raise RuntimeError(message)
+    return step
+
+
+def test_optional_failure_is_reported_but_ready():
+    state = WarmupState()
+    snapshot = run_warmup(state, [("imports", lambda: None, True), ("embedding_model", fail("offline"), False)])
+    assert state.ready
+    assert snapshot["status"] == "degraded"
+    assert snapshot["errors"] == {"embedding_model": "offline"}
+    assert snapshot["required_errors"] == {}
+
+
+def test_required_step_is_retried(monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_BACKOFF_SECONDS", 0)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("not yet")
+
+    state = WarmupState()
+    snapshot = run_warmup(state, [("default_agent", flaky, True)])
+    assert len(calls) == 3
+    assert state.ready
+    assert snapshot["status"] == "ready"
+    assert snapshot["errors"] == {}
+
+
+def test_required_failure_blocks_readiness(monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(warmup, "WARMUP_REQUIRED_ATTEMPTS", 2)
+    state = WarmupState()
+    snapshot = run_warmup(state, [("default_agent", fail("broken"), True)])
+    assert not state.ready
+    assert snapshot["status"] == "failed"
+    assert snapshot["required_errors"] == {"default_agent": "broken"}